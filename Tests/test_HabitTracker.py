@@ -1 +1,812 @@
-# The pytest for the app
\ No newline at end of file
+# The pytest for the app
+import json
+import os
+import pytest
+from datetime import datetime
+from habittracker import storage
+from habittracker.domain import add_habit, delete_habit, check_off
+
+
+@pytest.fixture
+def temp_storage(tmp_path, monkeypatch):
+    """Point the storage at a fresh JSON file for each test."""
+    monkeypatch.setattr(storage, "FILE_PATH", str(tmp_path / "habits.json"))
+    monkeypatch.setattr(storage, "JOURNAL_ENABLED", False)
+    monkeypatch.setattr(storage, "BACKEND", "json")
+    storage.init_storage()
+    return tmp_path
+
+
+def test_journal_mode_appends_and_replays(temp_storage):
+    storage.use_journal(True)
+    assert add_habit("Read", "daily")
+    ok, _ = check_off("read", datetime.now())
+    assert ok
+    # the snapshot is untouched, the changes live in the journal
+    with open(storage.FILE_PATH) as file:
+        assert file.read() == "[]"
+    with open(storage.get_backend().journal_path()) as file:
+        assert len(file.readlines()) == 2
+    habits = storage.load_habits()
+    assert [h.name for h in habits] == ["Read"]
+    assert len(habits[0].completions) == 1
+
+
+def test_journal_compaction(temp_storage, monkeypatch):
+    storage.use_journal(True)
+    monkeypatch.setattr(storage, "COMPACT_EVERY", 3)
+    add_habit("A", "daily")
+    add_habit("B", "daily")
+    delete_habit("A")     # third entry triggers compaction
+    assert not os.path.exists(storage.get_backend().journal_path())
+    assert [h.name for h in storage.load_habits()] == ["B"]
+
+
+def test_unlocked_load_survives_compaction(temp_storage, monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_ENABLED", True)
+    assert add_habit("Read", "daily")                    # only in the journal
+    backend = storage.get_backend()
+    original = backend.read_journal
+    compacted = []
+
+    def read_then_compact():
+        events = original()
+        if not compacted:                                # another process compacts right now
+            compacted.append(1)
+            other = storage.JsonBackend(storage.FILE_PATH, journal=True)
+            other.save_habits(other.load_habits())
+        return events
+
+    monkeypatch.setattr(backend, "read_journal", read_then_compact)
+    assert [h.name for h in backend.load_habits()] == ["Read"] and compacted
+    assert check_off("read", datetime.now())[0]
+    assert [h.name for h in storage.load_habits()] == ["Read"]
+
+def test_sqlite_backend_rules_and_migration(temp_storage):
+    add_habit("Run", "weekly")
+    storage.set_backend("sqlite")
+    from habittracker.migrate import migrate
+    assert migrate(storage.FILE_PATH) == 1
+    backend = storage.get_backend()
+    habit = backend.get_habit("RUN")
+    habit.created_at = "2024-01-01"
+    backend.save_habits([habit])
+    assert check_off("run", datetime(2024, 3, 4))[0]        # Monday
+    assert not check_off("run", datetime(2024, 3, 10))[0]   # Sunday, same ISO week
+    assert backend.get_habit("run").completions == ["2024-03-04"]
+    assert delete_habit("Run")
+    assert backend.load_habits() == []
+
+
+def test_sqlite_domain_operations_do_not_load_everything(temp_storage, monkeypatch):
+    from habittracker.domain import check_off_many
+    from habittracker.habit import Habit
+    from habittracker.sqlite_storage import SqliteBackend
+    monkeypatch.setattr(storage, "BACKEND", "sqlite")
+    storage.init_storage()
+    backend = storage.get_backend()
+    loads = []
+    original = backend.load_habits
+    monkeypatch.setattr(backend, "load_habits", lambda: loads.append(1) or original())
+    assert add_habit("Read", "daily") and not add_habit(" READ ", "daily")
+    assert check_off("read", datetime.now())[0]
+    assert not check_off("Read", datetime.now())[0]          # duplicate, from the indexed lookup
+    results = check_off_many([("Read", "2024-01-01"), ("read", "2024-01-01")])
+    assert [ok for ok, _ in results] == [False, False]       # before created_at
+    other = SqliteBackend(backend.path)                      # another process adds a habit
+    other.add_habit(Habit("Gym", "weekly", "2024-01-01"))
+    other.close()
+    assert [ok for ok, _ in check_off_many([("gym", "2024-01-01"), ("Gym", "2024-01-02")])] == [True, False]
+    assert delete_habit("gym") and not delete_habit("gym")
+    assert loads == []
+    assert [h.name for h in storage.load_habits()] == ["Read"]
+
+def test_repository_reloads_only_after_external_change(temp_storage, monkeypatch):
+    from habittracker.repository import get_repository
+    repo = get_repository()
+    add_habit("Walk", "daily")
+    loads = []
+    backend = storage.get_backend()
+    original = backend.load_habits
+    monkeypatch.setattr(backend, "load_habits", lambda: loads.append(1) or original())
+    assert repo.get("WALK").name == "Walk"
+    assert len(repo.all()) == 1
+    assert loads == []                      # served from memory
+    with open(storage.FILE_PATH, "w") as file:
+        file.write('[{"name": "Swim", "periodicity": "weekly", "created_at": "2024-01-01"}]')
+    assert [h.name for h in repo.all()] == ["Swim"]
+    assert loads == [1]
+
+
+def test_write_during_load_is_not_lost(temp_storage, monkeypatch):
+    from habittracker.habit import Habit
+    from habittracker.repository import get_repository
+    storage.save_habits([Habit("Read", "daily", "2024-01-01"), Habit("Gym", "daily", "2024-01-01")])
+    repo = get_repository()
+    backend = storage.get_backend()
+    original = backend.load_habits
+
+    def load_while_another_process_writes():
+        habits = original()
+        other = storage.JsonBackend(storage.FILE_PATH).load_habits()   # another process checks off Gym
+        other[1].add_completion("2024-01-02")
+        storage.JsonBackend(storage.FILE_PATH).save_habits(other)
+        monkeypatch.setattr(backend, "load_habits", original)
+        return habits
+
+    monkeypatch.setattr(backend, "load_habits", load_while_another_process_writes)
+    repo.all()                                      # unlocked read, like `list`
+    assert check_off("Read", datetime(2024, 1, 2))[0]
+    assert {h.name: h.completions for h in storage.load_habits()} == {"Read": ["2024-01-02"], "Gym": ["2024-01-02"]}
+
+
+def test_period_index_and_compact_completions():
+    from habittracker.habit import Habit, habit_from_dict
+    h = Habit("Review", "weekly", "2020-01-01", ["2021-01-11", "2020-12-28"])
+    assert h.has_completion_in_period("2021-01-03")      # same ISO week as 2020-12-28 (2020-W53)
+    assert not h.has_completion_in_period("2021-01-04")
+    h.add_completion("2021-01-04")
+    assert h.has_completion_in_period("2021-01-10")
+    assert h.ordinals.typecode == "i"
+    assert h.completions == ["2020-12-28", "2021-01-04", "2021-01-11"]   # kept sorted
+    assert habit_from_dict(h.to_dict()).to_dict() == h.to_dict()
+
+
+def random_habits(seed, count=200):
+    """Habits with random histories (runs and gaps, some across year ends)."""
+    import random
+    from datetime import date, timedelta
+    from habittracker.habit import Habit
+    rng = random.Random(seed)
+    habits = []
+    for i in range(count):
+        period = rng.choice(["daily", "weekly"])
+        step = 1 if period == "daily" else 7
+        day = date(2015, 1, 1) + timedelta(days=rng.randrange(3000))
+        dates = []
+        for _ in range(rng.randrange(0, 60)):
+            dates.append(day.isoformat())
+            day += timedelta(days=step * rng.choice([1, 1, 1, 2, 5]))
+        habits.append(Habit(f"h{i}", period, "2015-01-01", dates))
+    return habits
+
+
+def test_streak_summaries_fallback_matches_single(monkeypatch):
+    from habittracker import analytics
+    monkeypatch.setattr(analytics, "numpy_streaks", None)
+    assert analytics.streak_summaries(random_habits(1)) == [
+        analytics.streak_summary_for(h) for h in random_habits(1)
+    ]
+
+
+def test_numpy_engine_matches_pure_python():
+    pytest.importorskip("numpy")
+    from habittracker import analytics
+    for seed in range(5):
+        assert analytics.streak_summaries(random_habits(seed)) == [
+            analytics.streak_summary_for(h) for h in random_habits(seed)
+        ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_weekly_runs_across_year_boundaries(seed):
+    """Property: consecutive Mondays always form one run, whatever the ISO year length."""
+    import random
+    from datetime import date, timedelta
+    from habittracker.analytics import weekly_runs
+    rng = random.Random(seed)
+    year = rng.randrange(1990, 2100)
+    start = date(year, 12, rng.randrange(1, 32))    # start close to a year boundary
+    start -= timedelta(days=start.weekday())        # the Monday of that week
+    weeks = rng.randrange(1, 120)
+    keys = [(start + timedelta(weeks=i)).isocalendar()[:2] for i in range(weeks)]
+    rng.shuffle(keys)
+    assert weekly_runs(keys) == (weeks, weeks)
+    # a one-week gap splits the run in two
+    if weeks > 2:
+        gap = rng.randrange(1, weeks - 1)
+        keys = [(start + timedelta(weeks=i + (i >= gap))).isocalendar()[:2] for i in range(weeks)]
+        assert weekly_runs(keys) == (weeks - gap, max(gap, weeks - gap))
+
+
+def test_weekly_streak_from_52_week_year():
+    from habittracker.analytics import weekly_runs
+    assert weekly_runs([(2022, 51), (2022, 52), (2023, 1)]) == (3, 3)     # 2022 has 52 weeks
+    assert weekly_runs([(2020, 52), (2020, 53), (2021, 1)]) == (3, 3)     # 2020 has 53 weeks
+
+
+def test_incremental_streak_matches_full_recompute():
+    import random
+    from habittracker.analytics import streak_summary_for
+    from habittracker.habit import Habit, habit_from_dict
+    rng = random.Random(7)
+    for h in random_habits(3, count=50):
+        fresh = Habit(h.name, h.periodicity, h.created_at, [])
+        dates = h.completions
+        backdated = dates.pop(rng.randrange(len(dates) - 1)) if len(dates) > 2 else None
+        for ts in dates:
+            fresh.add_completion(ts)
+        assert fresh.streak is not None           # kept up to date in order
+        if backdated:
+            fresh.add_completion(backdated)
+            assert fresh.streak is None           # out of order → recompute later
+        assert streak_summary_for(fresh) == streak_summary_for(Habit(h.name, h.periodicity, h.created_at, h.completions))
+        assert habit_from_dict(fresh.to_dict()).streak == fresh.streak
+
+
+def test_leaderboard_top_k():
+    from datetime import date
+    from habittracker.analytics import leaderboard, streak_summary_for
+    habits = random_habits(5)
+    daily = [h for h in habits if h.periodicity == "daily"]
+    expected = sorted(daily, key=lambda h: streak_summary_for(h)["longest_streak"], reverse=True)[:3]
+    top = leaderboard(iter(habits), 3, by="longest", period="daily")
+    assert [row[0] for row in top] == [h.name for h in expected]
+    assert all(unit == "days" for _, _, unit in top)
+    rates = leaderboard(habits, 2, by="rate", today=date(2030, 1, 1))
+    assert len(rates) == 2 and 0 <= rates[1][1] <= rates[0][1] <= 1
+
+
+@pytest.mark.parametrize("text", ["2024-02-29", "2024-1-5", "2023-02-29", "2024-13-01", "2024-01-01x", "24-01-01", ""])
+def test_parse_iso_matches_strptime(text):
+    from habittracker.time_utils import parse_iso, ISO_FORMAT
+    try:
+        expected = datetime.strptime(text, ISO_FORMAT)
+    except ValueError:
+        with pytest.raises(ValueError):
+            parse_iso(text)
+    else:
+        assert parse_iso(text) == expected
+
+
+def test_iter_habits_streams_snapshot_and_journal(temp_storage, monkeypatch):
+    from habittracker.analytics import longest_daily_streak
+    from habittracker.habit import habit_from_dict
+    storage.save_habits(random_habits(9, count=30))
+    storage.use_journal(True)
+    backend = storage.get_backend()
+    backend.append_event({"op": "delete", "name": "h3"})
+    backend.append_event({"op": "add", "habit": {"name": "h3", "periodicity": "daily", "created_at": "2024-01-01"}})
+    backend.append_event({"op": "complete", "name": "h3", "date": "2024-01-02"})
+    backend.append_event({"op": "add", "habit": {"name": "new", "periodicity": "weekly", "created_at": "2024-01-01"}})
+    backend.append_event({"op": "complete", "name": "h5", "date": "2030-01-01"})
+    expected = [h.to_dict() for h in storage.load_habits()]
+
+    # replay through the full list (the reference) must give the same result
+    with open(storage.FILE_PATH) as file:
+        reference = [habit_from_dict(item) for item in json.load(file)]
+    backend.replay_journal(reference)
+    assert expected == [h.to_dict() for h in reference]
+
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 7)   # force objects to span chunks
+    assert [h.to_dict() for h in storage.iter_habits()] == expected
+    assert longest_daily_streak(storage.iter_habits()) == longest_daily_streak(reference)
+
+
+def test_malformed_tail_raises_and_keeps_file(temp_storage, monkeypatch, capsys):
+    from habittracker import cli, main
+    storage.save_habits(random_habits(2, count=5))
+    with open(storage.FILE_PATH) as file:
+        text = file.read()
+    broken = text[: len(text) - 40]                 # cut the last habit in half
+    with open(storage.FILE_PATH, "w") as file:
+        file.write(broken)
+    with pytest.raises(storage.HabitFileError):
+        storage.load_habits()
+    with open(storage.FILE_PATH) as file:
+        assert file.read() == broken
+
+    monkeypatch.setattr(storage, "REAL_FILE", storage.FILE_PATH)
+    capsys.readouterr()
+    assert cli.main(["list"]) == 1                  # a clear message, not a traceback
+    assert "file left unchanged" in capsys.readouterr().err
+    open(storage.FILE_PATH, "w").close()            # zero bytes
+    monkeypatch.setattr(main, "choose_profile", lambda: None)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "1")
+    assert main.run() == 1 and "Error:" in capsys.readouterr().out
+    assert os.path.getsize(storage.FILE_PATH) == 0
+
+    with open(storage.FILE_PATH, "w") as file:       # one bad date
+        json.dump([{"name": "Read", "periodicity": "daily", "completions": ["2024-01-02", "2024-13-01"]}], file)
+    assert cli.main(["list"]) == 1
+    assert "'Read' has an invalid completion date '2024-13-01'" in capsys.readouterr().err
+
+
+STRESS_WORKER = """
+import sys
+from datetime import datetime, timedelta
+from habittracker import storage
+from habittracker.domain import check_off
+storage.FILE_PATH = sys.argv[1]
+storage.use_journal(sys.argv[2] == "journal")
+worker, days = int(sys.argv[3]), int(sys.argv[4])
+for i in range(days):
+    ok, msg = check_off("Stretch", datetime(2020, 1, 1) + timedelta(days=worker * days + i))
+    assert ok, msg
+"""
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "journal"])
+def test_concurrent_check_offs_lose_nothing(temp_storage, mode):
+    import subprocess
+    import sys
+    from habittracker.habit import Habit
+    storage.save_habits([Habit("Stretch", "daily", "2020-01-01")])
+    workers, days = 4, 15
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = [
+        subprocess.Popen([sys.executable, "-c", STRESS_WORKER, storage.FILE_PATH, mode, str(w), str(days)], cwd=root)
+        for w in range(workers)
+    ]
+    assert [p.wait() for p in procs] == [0] * workers
+    habits = storage.load_habits()
+    assert len(habits) == 1 and len(habits[0].ordinals) == workers * days
+
+
+def test_check_off_many_applies_rules_and_saves_once(temp_storage, monkeypatch):
+    import io
+    from habittracker.domain import check_off_many
+    from habittracker.habit import Habit
+    from habittracker.importer import import_completions
+    storage.save_habits([Habit("Read", "daily", "2024-01-01"), Habit("Gym", "weekly", "2024-01-01")])
+    backend = storage.get_backend()
+    saves = []
+    original = backend.save_habits
+    monkeypatch.setattr(backend, "save_habits", lambda habits: saves.append(1) or original(habits))
+    data = io.StringIO(
+        "name,date\n"
+        "read,2024-01-02\n"
+        "Read,2024-01-02\n"      # same day twice
+        "Gym,2024-01-01\n"
+        "Gym,2024-01-07\n"       # same ISO week
+        "Gym,2023-12-31\n"       # before created_at
+        "Swim,2024-01-03\n"      # unknown habit
+        "Read,2999-01-01\n"      # future
+        "Read,not a date\n"
+    )
+    results = [ok for _, (ok, _) in import_completions(data, "csv")]
+    assert results == [True, False, True, False, False, False, False, False]
+    assert saves == [1]
+    habits = {h.name: h.completions for h in storage.load_habits()}
+    assert habits == {"Read": ["2024-01-02"], "Gym": ["2024-01-01"]}
+
+    lines = io.StringIO('{"name": "Read", "date": "2024-01-03"}\n{"name": "Read", "date": \n'
+                        '["Read"]\n{"name": "Read", "date": 20240104}\n{"name": 7, "date": "2024-01-05"}\n')
+    results = [result for _, result in import_completions(lines, "jsonl")]
+    assert [ok for ok, _ in results] == [True, False, False, False, False]
+    assert [msg.split(":")[0] for _, msg in results[1:]] == \
+        ["Invalid JSON on line 2.", "Invalid row on line 3", "Invalid date", "Invalid habit name"]
+    assert check_off_many([("Gym", datetime(2024, 1, 10).date())])[0][0] is False
+    from habittracker import importer
+    monkeypatch.setattr(importer, "set_profile", lambda profile: None)   # keep the temporary file
+    path = temp_storage / "bad.jsonl"
+    path.write_text('{"name": "Read", "date": "2024-01-08"}\nnot json\n')
+    assert importer.main([str(path)]) == 1 and storage.get_backend().get_habit("read").completions[-1] == "2024-01-08"
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_profile_registry_isolates_users_and_bounds_handles(tmp_path, backend):
+    import threading
+    from habittracker.analytics import list_all_habits
+    from habittracker.profiles import ProfileRegistry
+    registry = ProfileRegistry(str(tmp_path), backend=backend, max_open=3)
+    users = [f"user{i}" for i in range(8)]
+
+    def work(user):
+        profile = registry.get(user)
+        assert add_habit(f"Habit of {user}", "daily", profile=profile)
+        assert check_off(f"habit of {user}", datetime.now(), profile=profile)[0]
+
+    threads = [threading.Thread(target=work, args=(u,)) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert registry.open_count() <= 3
+    for user in users:
+        assert list_all_habits(registry.get(user).habits()) == [(f"Habit of {user}", "daily")]
+    with pytest.raises(ValueError):
+        registry.get("../escape")
+    registry.close()
+
+
+def test_cli_commands_and_batch(temp_storage, monkeypatch, capsys):
+    import io
+    from habittracker import cli
+    monkeypatch.setattr(storage, "REAL_FILE", storage.FILE_PATH)
+    assert cli.main(["add", "Read", "--period", "daily"]) == 0
+    assert cli.main(["add", "read"]) == 1
+    capsys.readouterr()
+    assert cli.main(["add", "   "]) == 1 and "Habit name cannot be empty." in capsys.readouterr().out
+    assert cli.main(["check", "READ"]) == 0
+    capsys.readouterr()
+    assert cli.main(["--json", "show", "Read"]) == 0
+    shown = json.loads(capsys.readouterr().out)
+    assert shown["result"]["completions"] == 1 and shown["result"]["current_streak"] == 1
+
+    commands = "add Gym --period weekly\n# comment\ncheck Gym --date 2999-01-01\nlist\nstreaks --top 2\nbogus\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(commands))
+    assert cli.main(["--json", "batch"]) == 1
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["ok"] for r in results] == [True, False, True, True, False]
+    assert results[2]["result"] == [{"name": "Read", "periodicity": "daily"}, {"name": "Gym", "periodicity": "weekly"}]
+
+
+def test_list_command_does_not_import_optional_engines(tmp_path):
+    import subprocess
+    import sys
+    script = (
+        "import sys; from habittracker import storage; storage.DEMO_FILE = sys.argv[1]\n"
+        "from habittracker.cli import main; main(['--profile', 'demo', 'list'])\n"
+        "print(sorted(m for m in ('numpy', 'sqlite3') if m in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", script, str(tmp_path / "h.json")], cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.splitlines()[-1] == "[]"
+
+
+def test_http_server_endpoints(tmp_path):
+    import asyncio
+    from habittracker.profiles import ProfileRegistry
+    from habittracker.server import HabitServer
+
+    async def call(port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        raw = await reader.read()
+        writer.close()
+        head, _, text = raw.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(text)
+
+    async def scenario():
+        app = HabitServer(ProfileRegistry(str(tmp_path)), workers=4)
+        server = await app.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            assert (await call(port, "POST", "/profiles/alice/habits", {"name": "Read"}))[0] == 201
+            assert (await call(port, "POST", "/profiles/alice/habits", {"name": "read"}))[0] == 409
+            future = [call(port, "POST", "/profiles/alice/habits/Read/check", {"date": f"2999-01-0{i}"}) for i in range(1, 4)]
+            checks = await asyncio.gather(*future, call(port, "POST", "/profiles/alice/habits/READ/check", {}))
+            assert [status for status, _ in checks] == [409, 409, 409, 200]
+            status, shown = await call(port, "GET", "/profiles/alice/habits/read")
+            assert status == 200 and shown["result"]["completions"] == 1
+            assert (await call(port, "GET", "/profiles/bob/habits"))[1]["result"] == []
+            assert app.registry.get("alice").write_lock is not None and app.registry.get("bob").write_lock is None
+            status, top = await call(port, "GET", "/profiles/alice/streaks?top=1")
+            assert top["result"] == [{"name": "Read", "value": 1, "unit": "days"}]
+            assert (await call(port, "GET", "/profiles/..%2Fx/habits"))[0] == 400
+            assert (await call(port, "PUT", "/profiles/alice/habits"))[0] == 405
+            assert (await call(port, "DELETE", "/profiles/alice/habits/read"))[0] == 200
+            assert (await call(port, "DELETE", "/profiles/alice/habits/read"))[0] == 404
+        finally:
+            server.close()
+            await server.wait_closed()
+            app.close()
+
+    asyncio.run(scenario())
+
+
+def test_server_streak_reads_do_not_race_check_offs(tmp_path):
+    import sys
+    import threading
+    from datetime import timedelta
+    from habittracker import analytics
+    from habittracker.profiles import ProfileRegistry
+    from habittracker.habit import Habit
+    from habittracker.server import show_habit
+    registry = ProfileRegistry(str(tmp_path))
+    profile = registry.get("alice")
+    start = datetime(2020, 1, 1)
+    repo = profile.repository
+    with repo.locked():                             # a long history makes each recompute slow
+        habit = Habit("Read", "daily", "2019-01-01")
+        repo.add(habit)
+        pairs = [(habit, (start + timedelta(days=2 * i + 1)).strftime("%Y-%m-%d")) for i in range(10000)]
+        for _, day in pairs:
+            habit.add_completion(day)
+        repo.save_completions(pairs)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)                     # switch threads as often as possible
+
+    def writer():   # backdated check-offs drop the cached streak, so readers recompute it
+        for i in range(150, 0, -1):
+            check_off("Read", start + timedelta(days=2 * i), profile=profile)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        while thread.is_alive():
+            show_habit(profile, "read")
+            habit = repo.get("read")
+            with repo.reading():
+                cached = habit.streak
+                fresh = analytics.consecutive_runs(analytics.period_numbers(habit))
+                if cached is not None and habit.ordinals:
+                    assert cached == (habit.period_of(habit.ordinals[-1]), *fresh)
+    finally:
+        thread.join()
+        sys.setswitchinterval(interval)
+        registry.close()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_timeline_window_queries_match_brute_force(seed):
+    import random
+    from datetime import date, timedelta
+    from habittracker.analytics import consecutive_runs, period_numbers
+    from habittracker.timeseries import Timeline
+    rng = random.Random(seed)
+    for habit in random_habits(seed, count=40):
+        timeline = Timeline(habit)
+        periods = list(period_numbers(habit))
+        days = [date.fromordinal(d) for d in habit.ordinals]
+        for _ in range(20):
+            start = date(2015, 1, 1) + timedelta(days=rng.randrange(-30, 3600))
+            end = start + timedelta(days=rng.randrange(0, 400))
+            lo, hi = max(timeline.period_of(start), timeline.created), timeline.period_of(end)
+            done = len({p for p in periods if lo <= p <= hi})
+            assert timeline.rate_between(start, end) == (done / (hi - lo + 1) if hi >= lo else 0.0)
+            assert timeline.count_between(start, end) == sum(start <= d <= end for d in days)
+
+            upto = [p for p in periods if p <= hi]
+            alive = upto and upto[-1] >= hi - 1
+            assert timeline.streak_as_of(end) == (consecutive_runs(upto)[0] if alive else 0)
+
+            weekdays = [sum(start <= d <= end and d.weekday() == w for d in days) for w in range(7)]
+            assert timeline.weekday_heatmap(start, end) == weekdays
+            weeks = timeline.iso_week_heatmap(start, end)
+            assert sum(count for _, count in weeks) == timeline.count_between(start, end)
+            assert weeks[0][0] == start.isocalendar()[:2] and weeks[-1][0] == end.isocalendar()[:2]
+        assert len(timeline.rolling_rates(date(2016, 1, 1), date(2016, 1, 31), days=30)) == 31
+
+
+def test_summarize_all_matches_serial_summaries(monkeypatch):
+    from habittracker import analytics
+    expected = [analytics.make_summary(h.periodicity, *analytics.consecutive_runs(analytics.period_numbers(h)))
+                for h in random_habits(7)]
+    monkeypatch.setattr(analytics, "PARALLEL_MIN_COMPLETIONS", 0)   # force the process pool
+    habits = random_habits(7)
+    habits[0].streak = None
+    assert analytics.summarize_all(habits, workers=2) == expected
+    assert all(h.streak is not None for h in habits)               # results are cached on the habits
+    assert analytics.summarize_all(random_habits(7), workers=1) == expected
+
+
+def test_metrics_record_only_when_enabled(temp_storage, monkeypatch, tmp_path):
+    from habittracker import cli, metrics
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.reset()
+    add_habit("Read", "daily")
+    assert metrics.snapshot() == {}
+
+    monkeypatch.setattr(storage, "REAL_FILE", storage.FILE_PATH)
+    report = tmp_path / "report.txt"
+    assert cli.main(["--profile-report", str(report), "--report-format", "prometheus", "check", "read"]) == 0
+    stats = metrics.snapshot()
+    assert stats["domain.check_off"]["count"] == 1
+    assert stats["storage.save_changes"]["count"] == 1
+    assert stats["storage.save_habits"]["bytes_written"] == os.path.getsize(storage.FILE_PATH)
+    text = report.read_text()
+    assert 'habittracker_operation_seconds_count{operation="domain.check_off"} 1' in text
+    assert 'habittracker_operation_seconds_bucket{operation="domain.check_off",le="+Inf"} 1' in text
+
+    metrics.reset()
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 64)           # habits span several chunks
+    storage.save_habits(random_habits(3, count=20))
+    storage.load_habits()
+    assert metrics.snapshot()["storage.load_habits"]["bytes_read"] == os.path.getsize(storage.FILE_PATH)
+    metrics.reset()
+
+
+def test_binary_snapshot_round_trip_and_backend(temp_storage, monkeypatch, tmp_path):
+    from habittracker import binary_storage
+    habits = random_habits(3, count=60)
+    habits[0].name = "Über Straße"
+    habits[1].streak = None
+    json_path = tmp_path / "in.json"
+    storage.JsonBackend(str(json_path)).save_habits(habits)
+    assert binary_storage.json_to_snapshot(str(json_path), str(tmp_path / "p.htsnap")) == 60
+    assert binary_storage.snapshot_to_json(str(tmp_path / "p.htsnap"), str(tmp_path / "out.json")) == 60
+    assert json.loads((tmp_path / "out.json").read_text()) == json.loads(json_path.read_text())
+
+    with binary_storage.SnapshotReader(str(tmp_path / "p.htsnap")) as reader:
+        assert reader.get("  über STRASSE ").to_dict() == habits[0].to_dict()
+        assert reader.get("h59").ordinals == habits[59].ordinals
+        assert reader.get("missing") is None
+    data = bytearray((tmp_path / "p.htsnap").read_bytes())
+    data[-1] ^= 0xFF
+    (tmp_path / "p.htsnap").write_bytes(bytes(data))
+    with pytest.raises(binary_storage.SnapshotError):
+        binary_storage.read_snapshot(str(tmp_path / "p.htsnap"))
+
+    monkeypatch.setattr(storage, "BACKEND", "binary")
+    storage.init_storage()
+    assert add_habit("Read", "daily") and not add_habit("read", "daily")
+    assert check_off("READ", datetime.now())[0]
+    assert not check_off("Read", datetime.now())[0]
+    assert storage.get_backend().get_habit("read").completions == [datetime.now().strftime("%Y-%m-%d")]
+    assert delete_habit("Read") and storage.load_habits() == []
+
+    from habittracker import cli
+    monkeypatch.setattr(storage, "REAL_FILE", str(tmp_path / "p.json"))   # the damaged p.htsnap
+    assert cli.main(["list"]) == 1                            # reported, not a traceback
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "binary"])
+def test_one_name_rule_for_all_domain_operations(temp_storage, monkeypatch, backend):
+    from habittracker.habit import HabitIndex, Habit, name_key
+    assert name_key("  Drink \t 4L   WATER ") == "drink 4l water"
+    index = HabitIndex([Habit("Read", "daily"), Habit("Gym", "weekly")])
+    assert "  READ" in index and index.get("gym").name == "Gym"
+    assert not index.add(Habit("read ", "daily"))
+    assert index.remove("READ").name == "Read" and [h.name for h in index] == ["Gym"]
+
+    monkeypatch.setattr(storage, "BACKEND", backend)
+    storage.init_storage()
+    assert add_habit("Drink  4L Water", "daily")
+    assert not add_habit("drink 4l   water", "daily")
+    assert check_off("DRINK 4L WATER", datetime.now())[0]
+    assert storage.get_backend().get_habit(" drink 4l water").name == "Drink  4L Water"
+    assert delete_habit("  drink 4L water ")
+    assert storage.load_habits() == []
+
+
+def test_sqlite_name_keys_are_upgraded(tmp_path):
+    import sqlite3
+    from habittracker.sqlite_storage import SCHEMA, SqliteBackend
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO habits (name, name_key, periodicity, created_at) VALUES (?, ?, ?, '2024-01-01')",
+                     [("Drink  Water", "drink  water", "daily"), ("Drink Water", "drink water", "weekly")])
+    conn.commit()
+    conn.close()
+    backend = SqliteBackend(path)
+    assert backend.get_habit("drink water").name == "Drink  Water"
+    assert backend.get_habit("drink water (2)").periodicity == "weekly"   # renamed, not hidden
+    assert backend.conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    backend.close()
+
+
+def test_colliding_legacy_names_are_renamed_not_dropped(temp_storage):
+    from habittracker.habit import HabitIndex, Habit
+    legacy = [
+        {"name": "Drink  Water", "periodicity": "daily", "created_at": "2024-01-01", "completions": ["2024-01-02"]},
+        {"name": "Drink Water", "periodicity": "weekly", "created_at": "2024-01-01", "completions": []},
+        {"name": "STRASSE", "periodicity": "daily", "created_at": "2024-01-01", "completions": []},
+        {"name": "Straße", "periodicity": "daily", "created_at": "2024-01-01", "completions": []},
+    ]
+    with open(storage.FILE_PATH, "w") as file:
+        json.dump(legacy, file)
+    index = HabitIndex(storage.load_habits())
+    assert index.renamed == [("Drink Water", "Drink Water (2)"), ("Straße", "Straße (2)")]
+
+    assert add_habit("Gym", "daily")
+    stored = {h.name: h for h in storage.load_habits()}
+    assert list(stored) == ["Drink  Water", "Drink Water (2)", "STRASSE", "Straße (2)", "Gym"]
+    assert stored["Drink  Water"].completions == ["2024-01-02"]
+    assert stored["Drink Water (2)"].periodicity == "weekly"
+    assert delete_habit("drink water (2)") and len(storage.load_habits()) == 4
+    assert HabitIndex([Habit("a", "daily"), Habit("A", "daily"), Habit("a (2)", "daily")]).renamed == \
+        [("A", "A (2)"), ("a (2)", "a (2) (2)")]
+
+
+def test_scheduler_due_habits_match_brute_force(temp_storage):
+    from datetime import date, timedelta
+    from habittracker.scheduler import Scheduler, period_bounds
+    from habittracker.repository import get_repository
+
+    def brute_due(habits, today):
+        first = {h.name: period_bounds(h.periodicity, today.toordinal())[0] for h in habits}
+        return sorted(h.name for h in habits if not any(d >= first[h.name] for d in h.ordinals))
+
+    def brute_tonight(habits, today):
+        names = []
+        for h in habits:
+            first, last = period_bounds(h.periodicity, today.toordinal())
+            previous = first - (1 if h.periodicity == "daily" else 7)
+            if last == today.toordinal() and any(previous <= d < first for d in h.ordinals) \
+                    and not any(d >= first for d in h.ordinals):
+                names.append(h.name)
+        return sorted(names)
+
+    habits = random_habits(11, count=300)
+    today = date(2020, 6, 1)
+    scheduler = Scheduler(habits, today)
+    for _ in range(30):
+        assert sorted(h.name for h in scheduler.due_now()) == brute_due(habits, today)
+        assert sorted(h.name for h in scheduler.breaking_tonight()) == brute_tonight(habits, today)
+        target = next(iter(scheduler.due_now()), None)
+        if target is not None:                        # check off one due habit
+            target.add_completion(today.isoformat())
+            scheduler.update(target)
+            assert not scheduler.is_due(target.name)
+        today += timedelta(days=1)
+        scheduler.advance(today)
+
+    storage.init_storage()
+    repo = get_repository()
+    scheduler = Scheduler(repo.all())
+    scheduler.attach(repo)
+    add_habit("Read", "daily")
+    assert [h.name for h in scheduler.due_now()] == ["Read"] and scheduler.breaking_tonight() == []
+    check_off("read", datetime.now())
+    assert scheduler.due_now() == [] and scheduler.next_due()[1].name == "Read"
+    delete_habit("READ")
+    assert len(scheduler) == 0 and scheduler.next_due() is None
+
+
+def test_scheduler_poll_reports_rollover_and_external_changes(temp_storage):
+    from datetime import date
+    from habittracker.habit import Habit
+    from habittracker.repository import get_repository
+    from habittracker.scheduler import Scheduler, poll
+    day = date(2024, 3, 5)
+    read, gym = Habit("Read", "daily", "2024-01-01"), Habit("Gym", "daily", "2024-01-01")
+    read.add_completion(day.isoformat())
+    storage.save_habits([read, gym])
+    repo = get_repository()
+    scheduler = Scheduler(repo.all(), day)
+    stamp = repo.backend.stamp()
+
+    habits = storage.load_habits()                  # another process checks off Gym ...
+    habits[1].add_completion(day.isoformat())
+    storage.save_habits(habits)
+    notes = []
+    day = date(2024, 3, 6)                          # ... and the day rolls over before the next poll
+    stamp = poll(scheduler, repo, stamp, notes.append, day)
+    assert sorted(note["name"] for note in notes if note["event"] == "due") == ["Gym", "Read"]
+    assert scheduler.is_due("gym") and scheduler.deadline_of(repo.get("gym")) == day.toordinal()
+
+    habits = storage.load_habits()
+    habits[0].add_completion(day.isoformat())
+    storage.save_habits(habits + [Habit("Swim", "weekly", "2024-01-01")])
+    notes.clear()
+    stamp = poll(scheduler, repo, stamp, notes.append, day)
+    assert [note["name"] for note in notes] == ["Swim"] and not scheduler.is_due("read")
+    storage.save_habits(storage.load_habits()[1:])
+    assert poll(scheduler, repo, stamp, notes.append, day) != stamp and len(scheduler) == 2
+
+def test_export_completions_incrementally_and_summaries(temp_storage, monkeypatch, tmp_path):
+    import csv
+    from datetime import date
+    from habittracker import exporter
+    habits = random_habits(5, count=30)
+    storage.save_habits(habits)
+    every = sorted((h.name, h.periodicity, d) for h in habits for d in h.completions)
+
+    out, mark = tmp_path / "all.csv", tmp_path / "mark.json"
+    monkeypatch.setattr(exporter, "CHUNK_ROWS", 7)     # several chunks
+    assert exporter.export(str(out), watermark=str(mark)) == len(every)
+    rows = list(csv.reader(out.open()))
+    assert rows[0] == exporter.COMPLETION_COLUMNS and sorted(map(tuple, rows[1:])) == every
+    assert set(json.loads(mark.read_text())["habits"]) == {h.name for h in habits}
+    assert exporter.export(str(out), watermark=str(mark)) == 0
+
+    habits[0].add_completion("2030-01-01")
+    habits[1].add_completion("1999-12-31")            # backdated, e.g. by the importer
+    storage.save_habits(habits)
+    assert exporter.export(str(out), watermark=str(mark)) == 2
+    assert sorted(list(csv.reader(out.open()))[1:]) == sorted([
+        [habits[0].name, habits[0].periodicity, "2030-01-01"], [habits[1].name, habits[1].periodicity, "1999-12-31"]])
+    assert exporter.export(str(out), watermark=str(mark)) == 0
+    assert exporter.export(str(out), since=date(2030, 1, 1)) == 1
+
+    mark.write_text(json.dumps({"last_date": "2029-12-31"}))   # watermark of the first format
+    assert exporter.export(str(out), watermark=str(mark)) == 1
+    with pytest.raises(ValueError):
+        exporter.export(str(out), rows="summary", watermark=str(mark))
+
+    assert exporter.export(str(out), rows="summary") == 30
+    summary = list(csv.DictReader(out.open()))
+    assert summary[0]["completions"] == str(len(habits[0].ordinals))
+
+
+def test_export_parquet_when_pyarrow_is_installed(temp_storage, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from habittracker import exporter
+    storage.save_habits(random_habits(6, count=20))
+    count = exporter.export(str(tmp_path / "out.parquet"), fmt="parquet")
+    table = pq.read_table(str(tmp_path / "out.parquet"))
+    assert table.num_rows == count and table.column_names == exporter.COMPLETION_COLUMNS
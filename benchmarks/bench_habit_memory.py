@@ -0,0 +1,51 @@
+"""
+Memory benchmark: bytes per stored completion.
+
+Compares the old representation (a list of 'YYYY-MM-DD' strings per habit)
+with the current Habit (sorted array of int32 day numbers, __slots__).
+
+Usage:
+    python benchmarks/bench_habit_memory.py [habits] [completions_per_habit]
+"""
+import json
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker.habit import Habit
+
+
+def make_dates(count):
+    """Return `count` consecutive ISO date strings starting 2015-01-01."""
+    start = date(2015, 1, 1)
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def measure(build):
+    """Return the number of bytes still allocated by build()'s result."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(habits=1000, per_habit=1000):
+    dates = make_dates(per_habit)
+    total = habits * per_habit
+
+    # before: every habit held its own list of strings, as created by json.load
+    encoded = json.dumps(dates)
+    before = measure(lambda: [json.loads(encoded) for _ in range(habits)])
+    after = measure(lambda: [Habit(f"habit {i}", "daily", "2015-01-01", dates) for i in range(habits)])
+
+    print(f"{habits} habits x {per_habit} completions")
+    print(f"list[str]:  {before / total:6.1f} bytes per completion")
+    print(f"array('i'): {after / total:6.1f} bytes per completion")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,42 @@
+"""
+Microbenchmark: ISO date parsing and period keys.
+
+Compares datetime.strptime with time_utils.parse_iso, and the cached
+daily_key / weekly_key, on a list of dates (default one million).
+
+Usage:
+    python benchmarks/bench_parse_iso.py [count]
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker.time_utils import ISO_FORMAT, parse_iso, daily_key, weekly_key
+
+
+def timed(label, func, values, baseline=None):
+    """Run func over all values and print the time per call."""
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<22} {elapsed / len(values) * 1e9:8.0f} ns/call{speedup}")
+    return elapsed
+
+
+def main(count=1_000_000):
+    # ~10 years of distinct dates, repeated like completions of many habits
+    first = date(2015, 1, 1)
+    dates = [(first + timedelta(days=i % 3650)).isoformat() for i in range(count)]
+    print(f"{count} dates")
+    baseline = timed("datetime.strptime", lambda s: datetime.strptime(s, ISO_FORMAT), dates)
+    timed("parse_iso", parse_iso, dates, baseline)
+    timed("daily_key (cached)", daily_key, dates, baseline)
+    timed("weekly_key (cached)", weekly_key, dates, baseline)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,144 @@
+"""
+Load test for the HTTP server (habittracker/server.py).
+
+Many clients (asyncio tasks, each with its own keep-alive connection)
+send a mix of requests: mostly reads (list, show, streaks), some
+check-offs. Reports requests/sec and p50/p99 latency.
+
+Without --url a server is started in this process on a temporary
+directory, with --users profiles that each have a few habits.
+
+Usage:
+    python benchmarks/bench_server_load.py [--url http://127.0.0.1:8080]
+        [--clients 50] [--requests 5000] [--users 20] [--backend json|sqlite]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker.profiles import ProfileRegistry
+from habittracker.server import HabitServer
+
+HABITS = ["Read", "Gym", "Drink 4L Water", "Call parents"]
+
+
+async def request(reader, writer, method, path, payload=None):
+    """Send one request on an open connection and return (status, parsed body)."""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def random_request(rng, users):
+    """Pick a request: 80% reads, 20% check-offs (of random past days)."""
+    user = rng.choice(users)
+    habit = quote(rng.choice(HABITS))
+    roll = rng.random()
+    if roll < 0.4:
+        return "GET", f"/profiles/{user}/habits", None
+    if roll < 0.6:
+        return "GET", f"/profiles/{user}/habits/{habit}", None
+    if roll < 0.8:
+        return "GET", f"/profiles/{user}/streaks?top=3", None
+    day = date.today() - timedelta(days=rng.randrange(365))
+    return "POST", f"/profiles/{user}/habits/{habit}/check", {"date": day.isoformat()}
+
+
+async def client(host, port, count, users, seed, latencies):
+    """One client: send `count` requests over one connection, recording latencies."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            method, path, payload = random_request(rng, users)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, payload)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                raise RuntimeError(f"{method} {path} failed with {status}")
+    finally:
+        writer.close()
+
+
+async def setup_users(host, port, users):
+    """Create the habits of every user (they may already exist)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    for user in users:
+        for i, name in enumerate(HABITS):
+            await request(reader, writer, "POST", f"/profiles/{user}/habits",
+                          {"name": name, "periodicity": "weekly" if i % 2 else "daily"})
+    writer.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(args):
+    app = server = tmp = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        app = HabitServer(ProfileRegistry(tmp.name, backend=args.backend))
+        server = await app.start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    users = [f"user{i}" for i in range(args.users)]
+    try:
+        await setup_users(host, port, users)
+        latencies = []
+        per_client = max(1, args.requests // args.clients)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(host, port, per_client, users, seed, latencies) for seed in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            app.close()
+            tmp.cleanup()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests, {args.clients} clients, {args.users} users"
+          + ("" if args.url else f", {args.backend} backend"))
+    print(f"throughput: {len(latencies) / elapsed:10.0f} requests/sec")
+    print(f"p50:        {percentile(latencies, 0.50) * 1000:10.2f} ms")
+    print(f"p99:        {percentile(latencies, 0.99) * 1000:10.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the Habit Tracker HTTP server.")
+    parser.add_argument("--url", help="server to test (default: start one in this process)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
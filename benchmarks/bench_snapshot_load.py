@@ -0,0 +1,70 @@
+"""
+Cold-load benchmark: JSON profile vs binary snapshot (binary_storage.py).
+
+Writes the same synthetic profile (see synthetic.py) in both formats and
+times, best of 3:
+    json.load             parsing the JSON file only
+    JsonBackend.load      parsing and building Habit objects
+    snapshot load         reading all habits from the snapshot (with checksum)
+    snapshot get          looking up a single habit by name through mmap
+
+Usage:
+    python benchmarks/bench_snapshot_load.py [habits] [max_completions_per_habit]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker.binary_storage import SnapshotReader, read_snapshot, write_snapshot
+from habittracker.storage import JsonBackend
+from synthetic import generate_habits
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def lookup(path, name):
+    with SnapshotReader(path, verify=False) as reader:
+        return reader.get(name)
+
+
+def main(count=10_000, per_habit=365):
+    habits = generate_habits(count, seed=1, history=(per_habit // 2, per_habit))
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "habits.json")
+        snapshot_path = os.path.join(directory, "habits.htsnap")
+        JsonBackend(json_path).save_habits(habits)
+        write_snapshot(snapshot_path, habits)
+        completions = sum(len(h.ordinals) for h in habits)
+        print(f"{count} habits, {completions} completions")
+        print(f"file size: JSON {os.path.getsize(json_path) / 1e6:.1f} MB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1e6:.1f} MB")
+
+        baseline = best_of(lambda: load_json(json_path))
+        rows = [
+            ("json.load", baseline),
+            ("JsonBackend.load", best_of(lambda: JsonBackend(json_path).load_habits())),
+            ("snapshot load", best_of(lambda: read_snapshot(snapshot_path))),
+            ("snapshot get (1)", best_of(lambda: lookup(snapshot_path, f"habit {count // 2}"))),
+        ]
+        for label, elapsed in rows:
+            print(f"{label:<18} {elapsed * 1000:10.2f} ms  ({baseline / elapsed:.1f}x vs json.load)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,78 @@
+"""
+Startup-time budget for the command line.
+
+Runs `habittracker list` in fresh interpreters and measures
+- the import time of habittracker.cli (python -X importtime), and
+- the wall time until the command's output is written.
+Exits with status 1 if either median goes over its budget, or if `list`
+imported an optional engine (NumPy, SQLite) it does not need.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = 60      # cumulative import time of habittracker.cli
+WALL_BUDGET_MS = 250       # interpreter start to output of `list`
+FORBIDDEN = ("numpy", "sqlite3")
+
+# Runs `list` against an empty temporary profile file
+SCRIPT = """
+import sys
+from habittracker import storage
+storage.DEMO_FILE = sys.argv[1]
+from habittracker.cli import main
+code = main(["--profile", "demo", "list"])
+sys.stdout.flush()
+bad = [name for name in {forbidden!r} if name in sys.modules]
+sys.exit(3 if bad else code)
+""".format(forbidden=FORBIDDEN)
+
+
+def import_time_ms():
+    """Return the cumulative import time of habittracker.cli in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import habittracker.cli"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        if line.rstrip().endswith("| habittracker.cli"):
+            return int(line.split("|")[1]) / 1000
+    raise RuntimeError("habittracker.cli not found in -X importtime output")
+
+
+def wall_time_ms(profile_file):
+    """Return the time from starting Python to the end of `list`'s output, in milliseconds."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SCRIPT, profile_file], cwd=ROOT, stdout=subprocess.PIPE, text=True
+    )
+    proc.stdout.readline()            # first line of output
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.stdout.read()
+    if proc.wait() == 3:
+        raise SystemExit(f"FAIL: `list` imported one of {FORBIDDEN}")
+    return elapsed
+
+
+def main(runs=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_file = os.path.join(tmp, "habits.json")
+        imports = statistics.median(import_time_ms() for _ in range(runs))
+        wall = statistics.median(wall_time_ms(profile_file) for _ in range(runs))
+    print(f"import habittracker.cli: {imports:6.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    print(f"`list` to first output:  {wall:6.1f} ms (budget {WALL_BUDGET_MS} ms)")
+    if imports > IMPORT_BUDGET_MS or wall > WALL_BUDGET_MS:
+        print("FAIL: startup budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:2])))
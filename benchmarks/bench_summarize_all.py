@@ -0,0 +1,59 @@
+"""
+Scaling benchmark: analytics.summarize_all with 1, 2, 4, ... worker processes.
+
+Builds habits with long random histories (runs with gaps), clears their
+cached streak state before each run and times the summaries. Speedup is
+relative to one worker (the serial path in this process).
+
+Usage:
+    python benchmarks/bench_summarize_all.py [habits] [completions_per_habit] [max_workers]
+"""
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker import analytics
+from habittracker.habit import Habit
+
+
+def make_habits(count, per_habit, seed=1):
+    """Habits with `per_habit` completions each, with occasional gaps."""
+    rng = random.Random(seed)
+    habits = []
+    for i in range(count):
+        habit = Habit(f"habit {i}", "daily" if i % 3 else "weekly", "2000-01-01")
+        step = 1 if habit.periodicity == "daily" else 7
+        day = 730120    # 2000-01-01
+        days = array("i")
+        for _ in range(per_habit):
+            days.append(day)
+            day += step * (1 if rng.random() < 0.9 else rng.randint(2, 5))
+        habit.ordinals = days
+        habit.streak = None
+        habits.append(habit)
+    return habits
+
+
+def main(count=20_000, per_habit=500, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    habits = make_habits(count, per_habit)
+    print(f"{count} habits x {per_habit} completions, {os.cpu_count()} CPUs, "
+          f"NumPy engine: {'yes' if analytics.streak_engine() else 'no'}")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        for h in habits:
+            h.streak = None
+        start = time.perf_counter()
+        analytics.summarize_all(habits, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f} s  ({baseline / elapsed:.1f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,164 @@
+"""
+Benchmark harness for storage, domain and analytics.
+
+For every profile size it generates a synthetic profile (see synthetic.py)
+in a temporary directory and times:
+    save_habits         full save of the profile
+    load_habits         cold load with a new backend object
+    check_off           one check-off through domain.check_off (mean per call)
+    streak_summary_for  summaries of all habits, without cached streaks
+    longest_streak      longest daily and weekly streak scans, without cached streaks
+The best of --repeat runs is kept (check_off: the mean of --checkoffs calls).
+
+Results are written as JSON. With --baseline, they are compared against an
+earlier results file, and the exit code is 1 if anything got slower by more
+than --tolerance.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--habits 10,1000,100000] [--history 30:365]
+        [--gaps geometric:0.2] [--seed 0] [--backend json|sqlite] [--journal]
+        [--repeat 3] [--checkoffs 20] [--out results.json]
+        [--baseline old.json] [--tolerance 0.10]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from habittracker import analytics, storage
+from habittracker.domain import check_off
+from habittracker.repository import get_repository
+from synthetic import generate_habits
+
+OPERATIONS = ["save_habits", "load_habits", "check_off", "streak_summary_for", "longest_streak"]
+
+
+def best_of(repeat, func, before=None):
+    """Return the fastest of `repeat` runs of func (before() runs untimed first)."""
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def clear_streaks(habits):
+    for h in habits:
+        h.streak = None if h.ordinals else (None, 0, 0)
+
+
+def bench_size(count, args, directory):
+    """Time every operation for one profile size. Returns {operation: seconds}."""
+    habits = generate_habits(count, args.seed, args.history, args.gaps)
+    storage.FILE_PATH = os.path.join(directory, f"profile_{count}.json")
+    backend = storage.get_backend()
+    backend.init()
+    result = {"save_habits": best_of(args.repeat, lambda: backend.save_habits(habits))}
+
+    # a new backend object each time, so nothing is cached between runs
+    storage._backends.clear()
+    result["load_habits"] = best_of(args.repeat, lambda: storage.get_backend().load_habits(),
+                                    before=storage._backends.clear)
+
+    repo = get_repository()
+    repo.all()   # warm cache: time the check-offs, not the first load
+    rng = random.Random(args.seed)
+    names = [h.name for h in rng.sample(habits, min(args.checkoffs, count))]
+    start = time.perf_counter()
+    for name in names:
+        ok, msg = check_off(name)
+        if not ok:
+            raise RuntimeError(msg)
+    result["check_off"] = (time.perf_counter() - start) / len(names)
+
+    result["streak_summary_for"] = best_of(
+        args.repeat, lambda: [analytics.streak_summary_for(h) for h in habits], before=lambda: clear_streaks(habits))
+    result["longest_streak"] = best_of(
+        args.repeat, lambda: (analytics.longest_daily_streak(habits), analytics.longest_weekly_streak(habits)),
+        before=lambda: clear_streaks(habits))
+    repo.close()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline timings. Returns the list of regressions."""
+    regressions = []
+    print(f"\n{'operation':<20} {'habits':>9} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for size, ops in results.items():
+        for op, seconds in ops.items():
+            old = baseline.get(size, {}).get(op)
+            if old is None:
+                continue
+            ratio = seconds / old if old else float("inf")
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  slower"
+                regressions.append((op, size, ratio))
+            print(f"{op:<20} {size:>9} {old * 1000:10.2f}ms {seconds * 1000:10.2f}ms {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def parse_history(text):
+    low, _, high = text.partition(":")
+    return int(low), int(high or low)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Habit Tracker benchmark harness.")
+    parser.add_argument("--habits", default="10,1000,100000", help="comma-separated profile sizes")
+    parser.add_argument("--history", type=parse_history, default=(30, 365), help="MIN:MAX completions per habit")
+    parser.add_argument("--gaps", default="geometric:0.2", help="none, geometric:P or uniform:N")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--journal", action="store_true", help="use the JSON journal mode")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--checkoffs", type=int, default=20)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    storage.set_backend(args.backend)
+    storage.use_journal(args.journal)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(size) for size in args.habits.split(",")):
+            results[str(count)] = bench_size(count, args, directory)
+            timings = "  ".join(f"{op}={results[str(count)][op] * 1000:.2f}ms" for op in OPERATIONS)
+            print(f"{count:>9} habits: {timings}")
+
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": analytics.streak_engine() is not None,
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} timings got slower by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Seeded generator of synthetic habit profiles for the benchmarks.
+
+The same arguments always give the same habits, so runs on different
+commits can be compared. Completions are built directly as day number
+arrays, so even a million habits are generated in seconds.
+
+Gap distributions (extra periods skipped between two completions):
+    none           always the next day/week (one long run)
+    geometric:P    each extra skipped period has probability P (default 0.2)
+    uniform:N      0..N extra periods, all equally likely
+"""
+import random
+from array import array
+from datetime import date
+from habittracker.habit import Habit
+
+
+def parse_gaps(spec):
+    """Turn a gap spec like 'geometric:0.2' into a function rng -> extra periods."""
+    kind, _, value = spec.partition(":")
+    if kind == "none":
+        return lambda rng: 0
+    if kind == "geometric":
+        p = float(value or 0.2)
+
+        def geometric(rng):
+            extra = 0
+            while rng.random() < p:
+                extra += 1
+            return extra
+        return geometric
+    if kind == "uniform":
+        most = int(value or 3)
+        return lambda rng: rng.randint(0, most)
+    raise ValueError(f"Unknown gap distribution: {spec}")
+
+
+def generate_habits(count, seed=0, history=(30, 365), gaps="geometric:0.2", weekly_share=0.3, today=None):
+    """
+    Create `count` habits with random histories.
+    Args:
+        count (int): Number of habits.
+        seed (int): Random seed.
+        history (tuple[int, int]): Min and max number of completions per habit.
+        gaps (str): Gap distribution, see the module docstring.
+        weekly_share (float): Share of weekly habits (the rest are daily).
+        today (date, optional): Histories end before this day, so it can still be checked off.
+    Returns:
+        list[Habit]: Habits named 'habit 0', 'habit 1', ...
+    """
+    rng = random.Random(seed)
+    gap = parse_gaps(gaps)
+    today = today or date.today()
+    habits = []
+    for i in range(count):
+        periodicity = "weekly" if rng.random() < weekly_share else "daily"
+        step = 7 if periodicity == "weekly" else 1
+        size = rng.randint(*history)
+        steps = [step * (1 + gap(rng)) for _ in range(size)]
+        # end at least one week before today, so today is free for daily and weekly check-offs
+        day = today.toordinal() - 7 - sum(steps)
+        days = array("i")
+        for s in steps:
+            days.append(day)
+            day += s
+        created = date.fromordinal(days[0] if days else today.toordinal() - 7)
+        habit = Habit(f"habit {i}", periodicity, created.isoformat())
+        habit.ordinals = days
+        habit.streak = None if days else (None, 0, 0)
+        habits.append(habit)
+    return habits
@@ -1 +1,18 @@
-# To access the files in habittracker
\ No newline at end of file
+# To access the files in habittracker
+# Submodules are imported on first access (PEP 562), e.g. habittracker.analytics,
+# so importing the package itself costs next to nothing.
+import importlib
+
+_SUBMODULES = {
+    "analytics", "binary_storage", "cli", "domain", "exporter", "habit", "importer", "main", "metrics", "migrate",
+    "numpy_streaks", "profiles", "repository", "scheduler", "server", "sqlite_storage", "storage", "time_utils", "timeseries",
+}
+
+def __getattr__(name):
+    """Import a submodule the first time it is accessed as an attribute."""
+    if name in _SUBMODULES:
+        return importlib.import_module(f"habittracker.{name}")
+    raise AttributeError(f"module 'habittracker' has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
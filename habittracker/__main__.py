@@ -0,0 +1,5 @@
+"""Allow `python -m habittracker ...` (see cli.py)."""
+import sys
+from habittracker.cli import main
+
+sys.exit(main())
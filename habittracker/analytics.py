@@ -1,111 +1,264 @@
 
+import heapq
+import os
 from datetime import date
-from habittracker.time_utils import daily_key, weekly_key
+from itertools import islice
+from habittracker import metrics
+from habittracker.time_utils import week_index, to_ordinal
+
+numpy_streaks = False   # optional NumPy engine: False = not imported yet, None = NumPy missing
+
+BATCH_SIZE = 4096   # habits per batch when scanning a stream of habits
+PARALLEL_MIN_COMPLETIONS = 200_000   # below this much work summarize_all stays in this process
+CHUNKS_PER_WORKER = 4   # smaller chunks spread uneven habits better over the workers
 
 def list_all_habits(habits):
     """Return (name, periodicity) pairs for simple listing."""
     return [(h.name, h.periodicity) for h in habits]
 
 def list_by_periodicity(habits, period):
-    """Filter habits by 'daily' or 'weekly'."""
+    """Filter habits by 'daily' or 'weekly' (habits can be a list or a stream)."""
     return [h for h in habits if h.periodicity == period]
 
-def daily_runs(day_keys):
+def consecutive_runs(numbers):
     """
-    Count consecutive-day runs for daily habits.
-    Returns (current_run, longest_run), both measured in days.
-    day_keys is a list of (Y, M, D) tuples.
+    Count runs of consecutive period numbers (days or weeks).
+    Returns (current_run, longest_run).
+    numbers must be sorted; a period follows the previous one if it is exactly 1 higher.
     """
-    if not day_keys:
+    if not numbers:
         return 0, 0
-    days = sorted(day_keys)  # ensure chronological order
-    current_run = 1          # at least the first day counts as a run of 1
+    current_run = 1          # at least the first period counts as a run of 1
     longest_run = 1
-    # Walk through the days and check if each day follows the previous by exactly 1 day
-    for i in range(1, len(days)):
-        prev_day = date(*days[i - 1])
-        curr_day = date(*days[i])
-        if (curr_day - prev_day).days == 1:
+    prev = numbers[0]
+    for curr in numbers[1:]:
+        if curr - prev == 1:
             current_run += 1
             if current_run > longest_run:
                 longest_run = current_run
         else:
-            # gap → run breaks and starts again with this day
+            # gap → run breaks and starts again with this period
             current_run = 1
-
+        prev = curr
     return current_run, longest_run
 
+def daily_runs(day_keys):
+    """
+    Count consecutive-day runs for daily habits.
+    Returns (current_run, longest_run), both measured in days.
+    day_keys is a list of (Y, M, D) tuples.
+    """
+    return consecutive_runs(sorted(date(*key).toordinal() for key in day_keys))
+
 def weekly_runs(week_keys):
     """
     Count consecutive-week runs for weekly habits (ISO weeks).
     Returns (current_run, longest_run), both measured in weeks.
     week_keys is a list of (ISO_year, ISO_week) tuples.
+    Weeks are turned into running week numbers, so week 52 (or 53) of one
+    year is followed by week 1 of the next year.
     """
-    if not week_keys:
-        return 0, 0
-    weeks = sorted(week_keys)
-    # Next ISO week helper (handles week 53 → week 1 of next year)
-    def next_week(y, w):
-        return (y, w + 1) if w < 53 else (y + 1, 1)
-    current_run = 1
-    longest_run = 1
-    for i in range(1, len(weeks)):
-        prev_week = weeks[i - 1]
-        curr_week = weeks[i]
-        if curr_week == next_week(*prev_week):
-            current_run += 1
-            if current_run > longest_run:
-                longest_run = current_run
-        else:
-            current_run = 1
-    return current_run, longest_run
+    return consecutive_runs(sorted(
+        week_index(date.fromisocalendar(y, w, 1).toordinal()) for y, w in week_keys
+    ))
+
+def make_summary(periodicity, current_run, longest_run):
+    """Build the summary dict used by streak_summary_for."""
+    if periodicity == "daily":
+        return {
+            "type": "daily",
+            "current_streak": current_run,
+            "longest_streak": longest_run,
+            "unit": "days",
+        }
+    return {
+        "type": "weekly",
+        "current_streak": current_run,
+        "longest_streak": longest_run,
+        "unit": "weeks",
+    }
 
+@metrics.timed("analytics.streak_summary_for")
 def streak_summary_for(habit):
     """
     Build a small summary for one habit using consecutive streak rules.
     - Daily: count consecutive days
     - Weekly: count consecutive ISO weeks
     Returns a dict {type, current_streak, longest_streak, unit}.
+    The streak state cached on the habit is used when available.
+    """
+    return _streak_summary(habit)
+
+def _streak_summary(habit):
+    """streak_summary_for without instrumentation, for the loops over many habits."""
+    if habit.streak is None:
+        remember_streak(habit, consecutive_runs(period_numbers(habit)))
+    _, current_run, longest_run = habit.streak
+    return make_summary(habit.periodicity, current_run, longest_run)
+
+def period_numbers(habit):
+    """
+    Return the habit's completions as sorted period numbers, where
+    consecutive days (daily) or consecutive weeks (weekly) differ by 1.
     """
     if habit.periodicity == "daily":
-        keys = [daily_key(ts) for ts in habit.completions]
-        current_run, longest_run = daily_runs(keys)
-        return {
-            "type": "daily",
-            "current_streak": current_run,
-            "longest_streak": longest_run,
-            "unit": "days",
-        }
-    else:
-        keys = [weekly_key(ts) for ts in habit.completions]
-        current_run, longest_run = weekly_runs(keys)
-        return {
-            "type": "weekly",
-            "current_streak": current_run,
-            "longest_streak": longest_run,
-            "unit": "weeks",
-        }
+        return habit.ordinals
+    return [week_index(day) for day in habit.ordinals]
 
-def longest_daily_streak(habits):
-    """Find the daily habit with the highest longest streak."""
+def remember_streak(habit, runs):
+    """Cache freshly computed (current_run, longest_run) on the habit."""
+    last_period = habit.period_of(habit.ordinals[-1]) if habit.ordinals else None
+    habit.streak = (last_period, runs[0], runs[1])
+
+def streak_engine():
+    """
+    Return the NumPy streak engine, or None if NumPy is not installed.
+    It is imported on first use, so commands that never need it stay fast.
+    """
+    global numpy_streaks
+    if numpy_streaks is False:
+        try:
+            from habittracker import numpy_streaks as engine
+        except ImportError:
+            engine = None
+        numpy_streaks = engine
+    return numpy_streaks
+
+@metrics.timed("analytics.streak_summaries")
+def streak_summaries(habits):
+    """
+    Streak summaries for many habits at once, in the same order.
+    Only habits without a cached streak state are recomputed, all in one
+    batch with the NumPy engine when NumPy is installed.
+    """
+    missing = [h for h in habits if h.streak is None]
+    engine = streak_engine() if missing else None
+    if engine is not None:
+        runs = engine.batch_runs([period_numbers(h) for h in missing])
+        for h, habit_runs in zip(missing, runs):
+            remember_streak(h, habit_runs)
+    return [_streak_summary(h) for h in habits]
+
+@metrics.timed("analytics.summarize_all")
+def summarize_all(habits, workers=None):
+    """
+    Streak summaries for a large number of habits, computed in several processes.
+    Args:
+        habits (list[Habit]): The habits to summarize.
+        workers (int, optional): Number of worker processes (default: one per CPU).
+    Returns:
+        list[dict]: The same dicts as streak_summary_for, in the same order.
+    Only habits without a cached streak state are sent to the workers, as
+    (periodicity, day number array) pairs, which pickle much smaller than
+    Habit objects. Small jobs (fewer than PARALLEL_MIN_COMPLETIONS completions
+    to scan) or workers=1 use streak_summaries in this process instead.
+    """
+    missing = [h for h in habits if h.streak is None]
+    work = sum(len(h.ordinals) for h in missing)
+    if workers == 1 or len(missing) < 2 or work < PARALLEL_MIN_COMPLETIONS:
+        return streak_summaries(habits)
+
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    size = -(-len(missing) // (workers * CHUNKS_PER_WORKER))   # ceiling division
+    chunks = [
+        [(h.periodicity, h.ordinals) for h in missing[i:i + size]]
+        for i in range(0, len(missing), size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(summarize_chunk, chunks)
+        for i, runs in enumerate(results):
+            for h, habit_runs in zip(missing[i * size:(i + 1) * size], runs):
+                remember_streak(h, habit_runs)
+    return [_streak_summary(h) for h in habits]
+
+def summarize_chunk(chunk):
+    """
+    Worker side of summarize_all: (current_run, longest_run) for every
+    (periodicity, day numbers) pair of a chunk.
+    """
+    periods = [
+        days if periodicity == "daily" else [week_index(day) for day in days]
+        for periodicity, days in chunk
+    ]
+    engine = streak_engine()
+    if engine is not None:
+        return engine.batch_runs(periods)
+    return [consecutive_runs(p) for p in periods]
+
+def in_batches(habits, size=BATCH_SIZE):
+    """Split any iterable of habits (e.g. storage.iter_habits()) into lists of at most size."""
+    it = iter(habits)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+@metrics.timed("analytics.longest_streak")
+def longest_streak(habits, period):
+    """
+    Find the habit of the given periodicity with the highest longest streak.
+    habits can be a list or a stream; it is processed in batches.
+    """
     best_habit = None
     best_streak = 0
-    for h in habits:
-        if h.periodicity == "daily":
-            summary = streak_summary_for(h)
+    for batch in in_batches(h for h in habits if h.periodicity == period):
+        for h, summary in zip(batch, streak_summaries(batch)):
             if summary["longest_streak"] > best_streak:
                 best_streak = summary["longest_streak"]
                 best_habit = h.name
-    return best_habit, best_streak, "days"
+    return best_habit, best_streak, "days" if period == "daily" else "weeks"
+
+def longest_daily_streak(habits):
+    """Find the daily habit with the highest longest streak."""
+    return longest_streak(habits, "daily")
 
 def longest_weekly_streak(habits):
     """Find the weekly habit with the highest longest streak."""
-    best_habit = None
-    best_streak = 0
-    for h in habits:
-        if h.periodicity == "weekly":
-            summary = streak_summary_for(h)
-            if summary["longest_streak"] > best_streak:
-                best_streak = summary["longest_streak"]
-                best_habit = h.name
-    return best_habit, best_streak, "weeks"
\ No newline at end of file
+    return longest_streak(habits, "weekly")
+
+def completion_rate(habit, today=None):
+    """
+    Share of periods (days or ISO weeks) since the habit was created
+    that have a completion, between 0.0 and 1.0.
+    """
+    today = (today or date.today()).toordinal()
+    created = to_ordinal(habit.created_at)
+    if habit.periodicity == "daily":
+        periods = today - created + 1
+    else:
+        periods = week_index(today) - week_index(created) + 1
+    if periods <= 0:
+        return 0.0
+    return min(1.0, len(habit.ordinals) / periods)
+
+@metrics.timed("analytics.leaderboard")
+def leaderboard(habits, k=5, by="longest", period=None, today=None):
+    """
+    Return the top k habits as (name, value, unit) tuples, best first.
+    Args:
+        habits (iterable[Habit]): The habits to rank (a list or any stream).
+        k (int): How many habits to return.
+        by (str): 'longest' or 'current' streak, or 'rate' (completion rate).
+        period (str, optional): Only rank 'daily' or 'weekly' habits.
+        today (date, optional): Reference day for the completion rate.
+    Returns:
+        list[tuple]: Ties keep the order of the input habits.
+    Uses one pass with heapq.nlargest over the cached summaries,
+    so memory stays bounded by k.
+    """
+    if by not in ("longest", "current", "rate"):
+        raise ValueError(f"Unknown leaderboard metric: {by}")
+
+    def rows():
+        for h in habits:
+            if period is not None and h.periodicity != period:
+                continue
+            if by == "rate":
+                yield h.name, completion_rate(h, today), "rate"
+            else:
+                summary = _streak_summary(h)
+                yield h.name, summary[by + "_streak"], summary["unit"]
+
+    return heapq.nlargest(k, rows(), key=lambda row: row[1])
@@ -0,0 +1,300 @@
+"""
+Binary snapshot storage backend, for fast cold loads of large profiles.
+Each profile uses its own snapshot file (habits.json -> habits.htsnap).
+
+File layout (all numbers little-endian):
+- header:   magic b"HTSN", format version, counts, section offsets and a
+            CRC-32 of everything after the header
+- records:  one fixed-size record per habit (string ids, periodicity,
+            number of completions, where they start, cached streak state)
+- index:    record numbers sorted by normalized name, for binary search
+- strings:  string table (offsets + UTF-8 bytes); names and creation
+            dates, each distinct string stored once
+- days:     all completions as packed int32 day numbers (date.toordinal)
+
+The file is read through mmap: get_habit() decodes only the index entries
+it compares and the one habit it returns, never the whole file.
+
+Converting between formats:
+    python -m habittracker.binary_storage to-binary FILE.json [FILE.htsnap]
+    python -m habittracker.binary_storage to-json FILE.htsnap [FILE.json]
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from habittracker import metrics
+from habittracker.habit import Habit, name_key
+from habittracker.storage import StorageBackend, JsonBackend, HabitFileError, apply_event, atomic_write, file_stamp
+
+MAGIC = b"HTSN"
+VERSION = 1
+# magic, version, flags, habits, strings, index offset, strings offset, days offset, CRC-32
+HEADER = struct.Struct("<4sHHIIQQQI")
+# name id, created_at id, periodicity, has streak, completions, first day, last period, current, longest
+RECORD = struct.Struct("<IIBBxxIQiII")
+PERIODICITIES = ("daily", "weekly")
+
+
+class SnapshotError(HabitFileError):
+    """
+    Raised when a snapshot file is not valid (wrong magic or version, bad checksum).
+    A HabitFileError, so the command line reports it like a broken JSON file.
+    """
+
+
+def snapshot_path_for(json_path):
+    """Return the snapshot file that replaces a profile's JSON file."""
+    base, _ = os.path.splitext(json_path)
+    return base + ".htsnap"
+
+
+def encode_snapshot(habits):
+    """Return the bytes of a snapshot holding the given habits."""
+    habits = list(habits)
+    strings = {}   # string -> id
+    def string_id(text):
+        return strings.setdefault(text, len(strings))
+
+    records = []
+    days = []
+    first_day = 0
+    for h in habits:
+        streak = h.streak
+        last_period, current, longest = streak if streak is not None else (None, 0, 0)
+        records.append(RECORD.pack(
+            string_id(h.name), string_id(h.created_at), PERIODICITIES.index(h.periodicity),
+            streak is not None, len(h.ordinals), first_day,
+            last_period if last_period is not None else 0, current, longest,
+        ))
+        days.append(h.ordinals)
+        first_day += len(h.ordinals)
+
+    order = sorted(range(len(records)), key=lambda i: name_key(habits[i].name))
+    index = array("I", order)
+
+    encoded = [text.encode("utf-8") for text in strings]   # dicts keep insertion order = id order
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    blob = b"".join(encoded)
+    blob += b"\0" * (-len(blob) % 4)                        # keep the day numbers 4-byte aligned
+
+    day_array = array("i")
+    for ordinals in days:
+        day_array.extend(ordinals)
+    if sys.byteorder == "big":
+        index.byteswap()
+        offsets.byteswap()
+        day_array.byteswap()
+
+    index_offset = HEADER.size + RECORD.size * len(records)
+    strings_offset = index_offset + 4 * len(index)
+    days_offset = strings_offset + 4 * len(offsets) + len(blob)
+    body = b"".join(records) + index.tobytes() + offsets.tobytes() + blob + day_array.tobytes()
+    header = HEADER.pack(MAGIC, VERSION, 0, len(records), len(strings),
+                         index_offset, strings_offset, days_offset, zlib.crc32(body))
+    return header + body
+
+
+class SnapshotReader:
+    """
+    Read-only view of a snapshot file through mmap.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path, verify=True):
+        """
+        Args:
+            path (str): The snapshot file.
+            verify (bool): Check the CRC-32 of the whole file (one fast pass in C).
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise SnapshotError(f"{path} is too short for a habit snapshot.")
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(verify)
+        except BaseException:
+            self._mm.close()
+            raise
+        self._strings = {}   # string id -> decoded string
+
+    def _read_header(self, verify):
+        (magic, version, _, self.count, self.string_count, self.index_offset,
+         self.strings_offset, self.days_offset, checksum) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a habit snapshot.")
+        if version != VERSION:
+            raise SnapshotError(f"{self.path} has snapshot version {version}, expected {VERSION}.")
+        if verify:
+            with memoryview(self._mm) as view, view[HEADER.size:] as body:
+                if zlib.crc32(body) != checksum:
+                    raise SnapshotError(f"{self.path} is damaged (checksum mismatch).")
+        self.blob_offset = self.strings_offset + 4 * (self.string_count + 1)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def string(self, string_id):
+        """Return a string of the string table."""
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = struct.unpack_from("<II", self._mm, self.strings_offset + 4 * string_id)
+            text = self._mm[self.blob_offset + start:self.blob_offset + end].decode("utf-8")
+            self._strings[string_id] = text
+        return text
+
+    def name_at(self, position):
+        """Return the name of the habit stored at a record position."""
+        return self.string(struct.unpack_from("<I", self._mm, HEADER.size + RECORD.size * position)[0])
+
+    def habit_at(self, position):
+        """Decode the habit stored at a record position."""
+        (name_id, created_id, periodicity, has_streak, count, first_day,
+         last_period, current, longest) = RECORD.unpack_from(self._mm, HEADER.size + RECORD.size * position)
+        habit = Habit(self.string(name_id), PERIODICITIES[periodicity], self.string(created_id))
+        start = self.days_offset + 4 * first_day
+        habit.ordinals = array("i")
+        habit.ordinals.frombytes(self._mm[start:start + 4 * count])
+        if sys.byteorder == "big":
+            habit.ordinals.byteswap()
+        if has_streak:
+            habit.streak = (last_period if count else None, current, longest)
+        else:
+            habit.streak = None if count else (None, 0, 0)
+        return habit
+
+    def __iter__(self):
+        for position in range(self.count):
+            yield self.habit_at(position)
+
+    def find(self, name):
+        """Return the record position of a habit (case-insensitive), or None. O(log n)."""
+        key = name_key(name)
+        lo, hi = 0, self.count
+        while lo < hi:     # binary search over the sorted index
+            mid = (lo + hi) // 2
+            position = struct.unpack_from("<I", self._mm, self.index_offset + 4 * mid)[0]
+            if name_key(self.name_at(position)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            position = struct.unpack_from("<I", self._mm, self.index_offset + 4 * lo)[0]
+            if name_key(self.name_at(position)) == key:
+                return position
+        return None
+
+    def get(self, name):
+        """Return the habit with this name (case-insensitive), or None."""
+        position = self.find(name)
+        return self.habit_at(position) if position is not None else None
+
+
+def read_snapshot(path):
+    """Load all habits from a snapshot file."""
+    with SnapshotReader(path) as reader:
+        return list(reader)
+
+def write_snapshot(path, habits):
+    """Save all habits to a snapshot file (atomically, see storage.atomic_write)."""
+    atomic_write(path, encode_snapshot(habits))
+
+
+class BinaryBackend(StorageBackend):
+    """Stores all habits of a profile in one binary snapshot file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def init(self):
+        if not os.path.exists(self.path):
+            write_snapshot(self.path, [])
+
+    @metrics.timed("storage.load_habits")
+    def load_habits(self):
+        if not os.path.exists(self.path):
+            return []
+        if metrics.ENABLED:
+            metrics.add_bytes(read=os.path.getsize(self.path))
+        return read_snapshot(self.path)
+
+    @metrics.timed("storage.save_habits")
+    def save_habits(self, habits):
+        write_snapshot(self.path, habits)
+
+    @metrics.timed("storage.save_changes")
+    def save_changes(self, habits, events):
+        """Persist several changes with one full write."""
+        if habits is None:
+            habits = self.load_habits()
+            for event in events:
+                apply_event(habits, event)
+        self.save_habits(habits)
+
+    def get_habit(self, name):
+        if not os.path.exists(self.path):
+            return None
+        with SnapshotReader(self.path, verify=False) as reader:
+            return reader.get(name)
+
+    def add_habit(self, habit):
+        self.save_changes(None, [{"op": "add", "habit": habit.to_dict()}])
+
+    def delete_habit(self, name):
+        habits = self.load_habits()
+        key = name_key(name)
+        deleted = next((h for h in habits if name_key(h.name) == key), None)
+        if deleted is None:
+            return False
+        self.save_habits([h for h in habits if h is not deleted])
+        return True
+
+    def add_completion(self, name, completion):
+        self.save_changes(None, [{"op": "complete", "name": name, "date": completion}])
+
+    def stamp(self):
+        return file_stamp(self.path)
+
+
+def json_to_snapshot(json_path, snapshot_path=None):
+    """
+    Convert a JSON profile (including its journal) into a snapshot file.
+    Returns the number of habits.
+    """
+    habits = JsonBackend(json_path).load_habits()
+    write_snapshot(snapshot_path or snapshot_path_for(json_path), habits)
+    return len(habits)
+
+def snapshot_to_json(snapshot_path, json_path=None):
+    """Convert a snapshot file back into a JSON profile. Returns the number of habits."""
+    habits = read_snapshot(snapshot_path)
+    JsonBackend(json_path or os.path.splitext(snapshot_path)[0] + ".json").save_habits(habits)
+    return len(habits)
+
+def main(argv=None):
+    """Convert between JSON and snapshot files. Returns the exit code."""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) not in (2, 3) or args[0] not in ("to-binary", "to-json"):
+        print(__doc__.strip().split("Converting between formats:")[1])
+        return 2
+    convert = json_to_snapshot if args[0] == "to-binary" else snapshot_to_json
+    count = convert(*args[1:])
+    print(f"Converted {count} habits.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Non-interactive command line for scripting.
+
+Usage:
+    python -m habittracker [--profile real|demo] [--json] COMMAND ...
+    python -m habittracker --profile-report FILE [--report-format json|prometheus] COMMAND ...
+    python -m habittracker --cprofile FILE COMMAND ...
+
+Commands:
+    add NAME [--period daily|weekly]       add a habit
+    delete NAME                            delete a habit
+    check NAME [--date YYYY-MM-DD]         check off a habit (default: today)
+    list [--period daily|weekly]           list habits
+    show NAME                              habit details and streaks
+    streaks [--top K] [--by ...]           longest streaks, or a top-K leaderboard
+    batch                                  run one command per line from stdin
+
+Without a command the interactive menu starts (see main.py).
+The exit code is 0 on success and 1 if a command failed.
+
+--profile-report writes call counts, latencies and bytes read/written per
+operation (see metrics.py) to FILE when the command ends; --cprofile runs
+the command under cProfile and saves the stats to FILE. Use '-' for stderr.
+"""
+import argparse
+import json
+import sys
+from habittracker import metrics
+from habittracker.storage import HabitFileError, init_storage, set_profile
+
+# The commands import what they need when they run, so e.g. `list`
+# does not pay for modules (or optional engines) it never uses.
+
+
+def build_parser():
+    """Create the argument parser with all subcommands."""
+    parser = argparse.ArgumentParser(prog="python -m habittracker", description="Habit Tracker command line.")
+    parser.add_argument("--profile", choices=["real", "demo"], default="real", help="which profile to use")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--profile-report", metavar="FILE", help="write timing stats to FILE on exit ('-' = stderr)")
+    parser.add_argument("--report-format", choices=["json", "prometheus"], default="json")
+    parser.add_argument("--cprofile", metavar="FILE", help="run the command under cProfile ('-' = print to stderr)")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    add = commands.add_parser("add", help="add a habit")
+    add.add_argument("name")
+    add.add_argument("--period", choices=["daily", "weekly"], default="daily")
+
+    delete = commands.add_parser("delete", help="delete a habit")
+    delete.add_argument("name")
+
+    check = commands.add_parser("check", help="check off a habit")
+    check.add_argument("name")
+    check.add_argument("--date", help="YYYY-MM-DD (default: today)")
+
+    listing = commands.add_parser("list", help="list habits")
+    listing.add_argument("--period", choices=["daily", "weekly"])
+
+    show = commands.add_parser("show", help="show habit details")
+    show.add_argument("name")
+
+    streaks = commands.add_parser("streaks", help="show longest streaks")
+    streaks.add_argument("--top", type=int, help="show a leaderboard of the top K habits")
+    streaks.add_argument("--by", choices=["longest", "current", "rate"], default="longest")
+    streaks.add_argument("--period", choices=["daily", "weekly"])
+
+    commands.add_parser("batch", help="run one command per line from stdin")
+    return parser
+
+
+# Each command returns (ok, data, lines): data is printed with --json, lines otherwise.
+
+def cmd_add(args):
+    from habittracker.domain import add_habit
+    if not args.name.strip():
+        return False, {"name": "", "periodicity": args.period}, ["Habit name cannot be empty."]
+    ok = add_habit(args.name, args.period)
+    return ok, {"name": args.name.strip(), "periodicity": args.period}, \
+        ["Habit added." if ok else "Habit already exists."]
+
+def cmd_delete(args):
+    from habittracker.domain import delete_habit
+    ok = delete_habit(args.name)
+    return ok, {"name": args.name}, ["Habit deleted." if ok else "Habit not found."]
+
+def cmd_check(args):
+    from habittracker.domain import check_off
+    from habittracker.time_utils import parse_iso
+    if args.date:
+        try:
+            when = parse_iso(args.date)
+        except ValueError:
+            return False, {"name": args.name, "message": "Invalid date."}, ["Invalid date."]
+    else:
+        when = None
+    ok, msg = check_off(args.name, when)
+    return ok, {"name": args.name, "message": msg}, [msg]
+
+def cmd_list(args):
+    from habittracker import analytics
+    from habittracker.repository import get_repository
+    habits = get_repository().all()
+    if args.period:
+        habits = analytics.list_by_periodicity(habits, args.period)
+    pairs = analytics.list_all_habits(habits)
+    data = [{"name": name, "periodicity": p} for name, p in pairs]
+    return True, data, [f"- {name} ({p})" for name, p in pairs] or ["No habits yet."]
+
+def cmd_show(args):
+    from habittracker import analytics
+    from habittracker.repository import get_repository
+    habit = get_repository().get(args.name)
+    if habit is None:
+        return False, {"name": args.name, "message": "Habit not found."}, ["Habit not found."]
+    summary = analytics.streak_summary_for(habit)
+    data = {
+        "name": habit.name,
+        "periodicity": habit.periodicity,
+        "created_at": habit.created_at,
+        "current_streak": summary["current_streak"],
+        "longest_streak": summary["longest_streak"],
+        "unit": summary["unit"],
+        "completions": len(habit.ordinals),
+    }
+    lines = [
+        f"Habit: {habit.name}",
+        f"Type: {habit.periodicity}",
+        f"Created at: {habit.created_at}",
+        f"Current streak: {summary['current_streak']} {summary['unit']}",
+        f"Longest streak: {summary['longest_streak']} {summary['unit']}",
+        f"Completions: {len(habit.ordinals)} times",
+    ]
+    return True, data, lines
+
+def cmd_streaks(args):
+    from habittracker import analytics
+    from habittracker.repository import get_repository
+    habits = get_repository().all()
+    if args.top:
+        top = analytics.leaderboard(habits, args.top, by=args.by, period=args.period)
+        data = [{"name": name, "value": value, "unit": unit} for name, value, unit in top]
+        lines = [
+            f"{i}) {name}: {value:.0%} completed" if unit == "rate" else f"{i}) {name}: {value} {unit}"
+            for i, (name, value, unit) in enumerate(top, start=1)
+        ]
+        return True, data, lines or ["No habits yet."]
+    data = {}
+    lines = []
+    for period in ("daily", "weekly"):
+        name, value, unit = analytics.longest_streak(habits, period)
+        data[period] = {"name": name, "streak": value, "unit": unit}
+        label = f"- {period.capitalize() + ':':<7}"
+        lines.append(f"{label} {name} with {value} {unit}" if name else f"{label} no {period} habits yet.")
+    return True, data, lines
+
+COMMANDS = {
+    "add": cmd_add,
+    "delete": cmd_delete,
+    "check": cmd_check,
+    "list": cmd_list,
+    "show": cmd_show,
+    "streaks": cmd_streaks,
+}
+
+
+def execute(args, out):
+    """Run one parsed command and print its result. Returns True on success."""
+    ok, data, lines = COMMANDS[args.command](args)
+    if args.json:
+        out.write(json.dumps({"ok": ok, "command": args.command, "result": data}) + "\n")
+    else:
+        for line in lines:
+            out.write(line + "\n")
+    return ok
+
+def run_batch(parser, args, lines, out):
+    """
+    Run one command per input line in this process (blank lines and # comments
+    are skipped). The outer --profile/--json apply to every line.
+    Returns True if every command succeeded.
+    """
+    import shlex
+    prefix = ["--profile", args.profile] + (["--json"] if args.json else [])
+    all_ok = True
+    for line in lines:
+        try:
+            words = shlex.split(line, comments=True)
+        except ValueError:  # e.g. unbalanced quotes
+            words = ["?"]
+        if not words:
+            continue
+        try:
+            line_args = parser.parse_args(prefix + words)
+        except SystemExit:  # argparse already printed the problem to stderr
+            line_args = None
+        if line_args is None or line_args.command in (None, "batch"):
+            all_ok = False
+            if args.json:
+                out.write(json.dumps({"ok": False, "command": None, "result": {"line": line.strip()}}) + "\n")
+            continue
+        set_profile(line_args.profile)   # a line may pick another profile
+        init_storage()
+        all_ok = execute(line_args, out) and all_ok
+    return all_ok
+
+def main(argv=None):
+    """Entry point for `python -m habittracker`. Returns the exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile_report:
+        metrics.enable()
+    try:
+        if args.cprofile:
+            return metrics.run_profiled(run_command, args.cprofile, parser, args)
+        return run_command(parser, args)
+    except HabitFileError as error:   # broken habits file: say why instead of a traceback
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if args.profile_report:
+            metrics.write_report(args.profile_report, args.report_format)
+
+def run_command(parser, args):
+    """Run the parsed command line (or the interactive menu). Returns the exit code."""
+    if args.command is None:
+        from habittracker.main import run
+        return run()
+    set_profile(args.profile)
+    init_storage()
+    if args.command == "batch":
+        ok = run_batch(parser, args, sys.stdin, sys.stdout)
+    else:
+        ok = execute(args, sys.stdout)
+    return 0 if ok else 1
@@ -1,27 +1,29 @@
 # Functions used by the CLI (main.py)
 
+from habittracker import metrics
 from habittracker.habit import Habit
-from habittracker.storage import load_habits, save_habits
+from habittracker.repository import get_repository
 from datetime import datetime
-from habittracker.time_utils import daily_key, weekly_key, to_iso, parse_iso
+from habittracker.time_utils import weekly_key, to_iso, parse_iso
 
 
 def is_future(date_object):
     """Return True if the given date is in the future."""
     return date_object > datetime.now()
 
-def add_habit(name, periodicity):
+def repository_for(profile=None):
+    """Return the repository of a profile (see profiles.py), or of the current default profile."""
+    return profile.repository if profile is not None else get_repository()
+
+@metrics.timed("domain.add_habit")
+def add_habit(name, periodicity, profile=None):
     """Add a new habit if it doesn’t already exist."""
     name = name.strip()
     if len(name) == 0:
         return False
-    habits = load_habits()
-    for h in habits:
-        if h.name.lower() == name.lower():
-            return False
-    habits.append(Habit(name, periodicity))
-    save_habits(habits)
-    return True
+    repo = repository_for(profile)
+    with repo.locked():
+        return repo.add(Habit(name, periodicity))
 
 
 def predefined_habits():
@@ -35,19 +37,16 @@ def predefined_habits():
     ]
 
 
-def delete_habit(name):
+@metrics.timed("domain.delete_habit")
+def delete_habit(name, profile=None):
     """Remove a habit by its name. Returns True if deleted."""
-    habits = load_habits()
-    new_list = [h for h in habits if h.name != name]  # keep everything except the one to delete
-
-    if len(new_list) == len(habits):  # nothing was removed
-        return False
-
-    save_habits(new_list)
-    return True
+    repo = repository_for(profile)
+    with repo.locked():
+        return repo.delete(name)
 
 
-def check_off(name, when_dt=None):
+@metrics.timed("domain.check_off")
+def check_off(name, when_dt=None, profile=None):
     """
     Mark a habit as completed.
     Rules:
@@ -55,46 +54,100 @@ def check_off(name, when_dt=None):
     - Weekly: only once per ISO week
     - No future dates allowed
     """
-    habits = load_habits()
-    name_key = name.strip().lower()
+    repo = repository_for(profile)
+    with repo.locked():  # other processes must not change the profile in between
+        return _check_off(repo, name, when_dt)
 
-    # find the matching habit
-    target = None
-    for h in habits:
-        if h.name.lower() == name_key:
-            target = h
-            break
+
+def _check_off(repo, name, when_dt):
+    """check_off for a caller that already holds the profile lock."""
+    target, when_iso, error = _check_rules(repo, name, when_dt)
+    if error:
+        return False, error
+
+    # record the new completion
+    repo.add_completion(target, when_iso)
+    return True, f"Checked off '{target.name}' for {when_iso}."
+
+
+def _check_rules(repo, name, when_dt):
+    """
+    Apply the check-off rules without saving anything.
+    Returns (habit, 'YYYY-MM-DD', None) if allowed, or (None, None, error message).
+    """
+    # find the matching habit (case-insensitive)
+    target = repo.get(name)
 
     if target is None:
-        return False, "Habit not found."
+        return None, None, "Habit not found."
 
     when_dt = when_dt or datetime.now()
 
     # prevent checking off in the future
     if is_future(when_dt):
-        return False, "Cannot check off in the future."
+        return None, None, "Cannot check off in the future."
 
     when_iso = to_iso(when_dt)  # format date as 'YYYY-MM-DD'
 
     # block check-offs before habit was created
     created_date = parse_iso(target.created_at).date()  # convert string to date
     if when_dt.date() < created_date:
-        return False, f"Cannot check off before the habit was created ({target.created_at})."
+        return None, None, f"Cannot check off before the habit was created ({target.created_at})."
 
     # check for duplicates in same day/week
-    if target.periodicity == "daily":
-        new_day = daily_key(when_iso)
-        for ts in target.completions:
-            if daily_key(ts) == new_day:
-                return False, f"'{target.name}' is already checked off for {when_iso}."
-    else:
-        new_week = weekly_key(when_iso)
-        for ts in target.completions:
-            if weekly_key(ts) == new_week:
-                y, w = new_week
-                return False, f"'{target.name}' is already checked off for week {y}-W{str(w).zfill(2)}."
-
-    # record the new completion and save
-    target.add_completion(when_iso)
-    save_habits(habits)
-    return True, f"Checked off '{target.name}' for {when_iso}."
\ No newline at end of file
+    if target.has_completion_in_period(when_iso):
+        if target.periodicity == "daily":
+            return None, None, f"'{target.name}' is already checked off for {when_iso}."
+        y, w = weekly_key(when_iso)
+        return None, None, f"'{target.name}' is already checked off for week {y}-W{str(w).zfill(2)}."
+
+    return target, when_iso, None
+
+
+@metrics.timed("domain.check_off_many")
+def check_off_many(items, profile=None):
+    """
+    Check off many habits at once, e.g. to import backfilled data.
+    The same rules as check_off apply to every item (also between items
+    of the same batch), but the profile is loaded once and saved once.
+    Args:
+        items (iterable): (name, when) pairs; when is a datetime or a 'YYYY-MM-DD' string.
+        profile (Profile, optional): The user's profile; default = current profile.
+    Returns:
+        list[tuple[bool, str]]: (ok, message) for every item, in the same order.
+    """
+    repo = repository_for(profile)
+    results = []
+    accepted = []
+    with repo.locked():
+        try:
+            _check_off_batch(repo, items, results, accepted)
+        except BaseException:
+            repo.invalidate()   # drop the unsaved in-memory completions
+            raise
+        repo.save_completions(accepted)   # one write for the whole batch
+    return results
+
+
+def _check_off_batch(repo, items, results, accepted):
+    """Validate the items of check_off_many and add the allowed ones in memory."""
+    for name, when in items:
+        if not isinstance(name, str):
+            results.append((False, f"Invalid habit name: {name!r}."))
+            continue
+        if isinstance(when, str):
+            try:
+                when = parse_iso(when.strip())
+            except ValueError:
+                results.append((False, f"Invalid date: {when!r}."))
+                continue
+        elif not isinstance(when, datetime):
+            results.append((False, f"Invalid date: {when!r}."))
+            continue
+        target, when_iso, error = _check_rules(repo, name, when)
+        if error:
+            results.append((False, error))
+            continue
+        target.add_completion(when_iso)   # in memory only, so later items see it
+        accepted.append((target, when_iso))
+        results.append((True, f"Checked off '{target.name}' for {when_iso}."))
@@ -0,0 +1,245 @@
+"""
+Export habits for an analytics warehouse, streaming.
+
+Usage:
+    python -m habittracker.exporter OUT [--rows completions|summary] [--format csv|parquet|arrow]
+        [--since YYYY-MM-DD] [--watermark FILE] [--profile real|demo]
+    python -m habittracker.exporter - --format csv      # CSV to stdout
+
+Rows:
+- completions: one row per completion (name, periodicity, date)
+- summary:     one row per habit (name, periodicity, created_at, completions,
+               current_streak, longest_streak, unit), see analytics.streak_summary_for
+
+Habits are read one at a time (storage.iter_habits) and rows are written in
+chunks of CHUNK_ROWS, so memory stays constant however big the profile is.
+Parquet and Arrow (IPC file) output need pyarrow; CSV needs nothing extra.
+
+Incremental exports: --since exports only completions on or after a date.
+--watermark FILE remembers which completions were exported (per habit, as
+ranges of consecutive dates), and the next run exports every completion
+added since, including backdated ones (e.g. from the importer). Both only
+apply to completion rows.
+Watermark file: {"version": 2, "habits": {NAME: {"created_at": ...,
+"ranges": [["YYYY-MM-DD", "YYYY-MM-DD"], ...]}}}. A habit deleted and
+created again under the same name (new created_at) is exported in full.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from bisect import bisect_right
+from datetime import date
+from itertools import islice
+from habittracker.storage import atomic_write, iter_habits, set_profile
+from habittracker.time_utils import from_ordinal, parse_iso, to_ordinal
+
+CHUNK_ROWS = 10_000   # rows written at a time
+COMPLETION_COLUMNS = ["name", "periodicity", "date"]
+SUMMARY_COLUMNS = ["name", "periodicity", "created_at", "completions", "current_streak", "longest_streak", "unit"]
+
+
+def completion_rows(habits, after=None):
+    """
+    Yield (name, periodicity, 'YYYY-MM-DD') for every completion,
+    only those after the day number `after` if given.
+    """
+    for habit in habits:
+        start = bisect_right(habit.ordinals, after) if after is not None else 0
+        for day in habit.ordinals[start:]:
+            yield habit.name, habit.periodicity, from_ordinal(day)
+
+def split_days(days, after, ranges):
+    """
+    Split a habit's sorted day numbers for an incremental export.
+    Args:
+        days (sequence[int]): The habit's completions (Habit.ordinals).
+        after (int or None): Only days after this one are exported now.
+        ranges (list[tuple[int, int]]): Sorted (first, last) day ranges exported before.
+    Returns:
+        tuple[list[int], list[int]]: The days to export now, and all days
+        exported once they are written.
+    """
+    new, known = [], []
+    i = 0
+    for day in days:
+        while i < len(ranges) and ranges[i][1] < day:
+            i += 1
+        if i < len(ranges) and ranges[i][0] <= day:
+            known.append(day)
+        elif after is None or day > after:
+            new.append(day)
+            known.append(day)
+    return new, known
+
+def day_ranges(days):
+    """Turn sorted day numbers into (first, last) ranges of consecutive days."""
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] == day - 1:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+def incremental_rows(habits, after, exported, default, state):
+    """
+    Yield the completion rows that were not exported yet (see read_watermark),
+    and record in `state` (name -> watermark entry) what is exported afterwards.
+    """
+    for habit in habits:
+        entry = exported.get(habit.name)
+        ranges = entry["ranges"] if entry and entry["created_at"] == habit.created_at else default
+        new, known = split_days(habit.ordinals, after, ranges)
+        state[habit.name] = {
+            "created_at": habit.created_at,
+            "ranges": [[from_ordinal(first), from_ordinal(last)] for first, last in day_ranges(known)],
+        }
+        for day in new:
+            yield habit.name, habit.periodicity, from_ordinal(day)
+
+def summary_rows(habits):
+    """Yield one summary row per habit (see SUMMARY_COLUMNS)."""
+    from habittracker.analytics import in_batches, streak_summaries
+    for batch in in_batches(habits):
+        for habit, summary in zip(batch, streak_summaries(batch)):
+            yield (habit.name, habit.periodicity, habit.created_at, len(habit.ordinals),
+                   summary["current_streak"], summary["longest_streak"], summary["unit"])
+
+def chunks(rows, size=None):
+    """Split a stream of rows into lists of at most size rows."""
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size or CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_csv(rows, columns, out):
+    """Write rows to an open text file as CSV with a header. Returns the row count."""
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for chunk in chunks(rows):
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+def write_columnar(rows, columns, path, fmt):
+    """
+    Write rows as Parquet or an Arrow IPC file, one record batch per chunk.
+    Returns the row count. Raises ImportError if pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError(f"The {fmt} format needs pyarrow (pip install pyarrow); use --format csv instead.")
+    types = {"date": pa.date32(), "completions": pa.int64(), "current_streak": pa.int64(), "longest_streak": pa.int64()}
+    schema = pa.schema([(column, types.get(column, pa.string())) for column in columns])
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    count = 0
+    try:
+        for chunk in chunks(rows):
+            values = [list(column) for column in zip(*chunk)]
+            if "date" in columns:
+                i = columns.index("date")
+                values[i] = [date.fromisoformat(day) for day in values[i]]
+            writer.write_batch(pa.record_batch(values, schema=schema))
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
+
+
+def read_watermark(path):
+    """
+    Read what a previous export wrote.
+    Returns:
+        tuple[dict, list]: {name: {"created_at", "ranges": [(first, last) day numbers]}},
+        and the ranges that count as exported for habits not listed. Files of
+        the first format ({"last_date": ...}) mean: everything up to that date.
+    """
+    if not os.path.exists(path):
+        return {}, []
+    with open(path) as file:
+        data = json.load(file)
+    if "last_date" in data:
+        return {}, [(1, to_ordinal(data["last_date"]))]
+    exported = {}
+    for name, entry in data["habits"].items():
+        ranges = [(to_ordinal(first), to_ordinal(last)) for first, last in entry["ranges"]]
+        exported[name] = {"created_at": entry["created_at"], "ranges": ranges}
+    return exported, []
+
+def export(out, rows="completions", fmt="csv", since=None, watermark=None, habits=None):
+    """
+    Export the habits of the current profile.
+    Args:
+        out (str): Output file, or '-' for stdout (CSV only).
+        rows (str): 'completions' or 'summary'.
+        fmt (str): 'csv', 'parquet' or 'arrow'.
+        since (date, optional): Only completions on or after this day.
+        watermark (str, optional): File listing the exported completions; read before and updated after.
+        habits (iterable[Habit], optional): What to export (default: storage.iter_habits()).
+    Returns:
+        int: Number of rows written.
+    """
+    if rows == "summary" and (since or watermark):
+        raise ValueError("--since and --watermark only apply to --rows completions.")
+    habits = iter_habits() if habits is None else habits
+    after = since.toordinal() - 1 if since else None
+    state = {}   # watermark entries, filled while the habits stream by
+
+    if rows == "summary":
+        columns, stream = SUMMARY_COLUMNS, summary_rows(habits)
+    elif watermark:
+        exported, default = read_watermark(watermark)
+        columns, stream = COMPLETION_COLUMNS, incremental_rows(habits, after, exported, default, state)
+    else:
+        columns, stream = COMPLETION_COLUMNS, completion_rows(habits, after)
+
+    if fmt == "csv":
+        if out == "-":
+            count = write_csv(stream, columns, sys.stdout)
+        else:
+            with open(out, "w", newline="") as file:
+                count = write_csv(stream, columns, file)
+    else:
+        if out == "-":
+            raise ValueError(f"The {fmt} format needs an output file.")
+        count = write_columnar(stream, columns, out, fmt)
+
+    if watermark:
+        atomic_write(watermark, json.dumps({"version": 2, "habits": state}))
+    return count
+
+def main(argv=None):
+    """Run the export command. Returns the process exit code."""
+    parser = argparse.ArgumentParser(prog="python -m habittracker.exporter", description="Export habits.")
+    parser.add_argument("out", help="output file, '-' for stdout (CSV only)")
+    parser.add_argument("--rows", choices=["completions", "summary"], default="completions")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    parser.add_argument("--since", help="only completions on or after YYYY-MM-DD")
+    parser.add_argument("--watermark", help="file remembering the exported completions (incremental exports)")
+    parser.add_argument("--profile", choices=["real", "demo"], default="real")
+    args = parser.parse_args(argv)
+
+    set_profile(args.profile)
+    try:
+        since = parse_iso(args.since).date() if args.since else None
+        count = export(args.out, args.rows, args.format, since, args.watermark)
+    except (ImportError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    if args.out != "-":
+        print(f"Exported {count} rows to {args.out}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,25 @@
 """"
 Defines the Habit class for storing habit data in JSON format.
 """
+from array import array
+from bisect import insort
 from datetime import datetime
+from habittracker.time_utils import to_ordinal, from_ordinal, week_index
 
 class Habit:
     """
     Represents a single habit with a name, periodicity ('daily' or 'weekly'),
-    a creation date, and a list of completion dates (as 'YYYY-MM-DD' strings).
+    a creation date, and its completion dates.
+    Completions are kept compactly as a sorted array of day numbers
+    (see date.toordinal); the 'YYYY-MM-DD' strings are only built when needed.
+
+    The streak state (last_period, current_run, longest_run) is cached in
+    `streak` and saved with the habit. add_completion keeps it up to date in
+    O(1) for completions added in date order; a backdated completion resets
+    it to None so analytics.py recomputes it from the full history.
     """
+    __slots__ = ("name", "periodicity", "created_at", "ordinals", "_periods", "streak")
+
     def __init__(self, name: str, periodicity: str, created_at=None, completions=None):
         """
         Initialize a new habit.
@@ -22,11 +34,60 @@ class Habit:
         self.created_at = created_at or datetime.now().strftime("%Y-%m-%d")  # default = today
         self.completions = completions if completions is not None else []     # empty list if none given
 
+    @property
+    def completions(self) -> list:
+        """The completion dates as sorted 'YYYY-MM-DD' strings (built on each access)."""
+        return [from_ordinal(day) for day in self.ordinals]
+
+    @completions.setter
+    def completions(self, completions):
+        self.ordinals = array("i", sorted(to_ordinal(ts) for ts in completions))  # parsed once
+        self._periods = None                         # set of occupied days/weeks, built on first use
+        # (last_period, current_run, longest_run); None = unknown, recomputed by analytics.py
+        self.streak = None if self.ordinals else (None, 0, 0)
+
+    def period_of(self, day: int):
+        """
+        Return the period a day number falls in:
+        the day itself for daily habits, the running week number for weekly habits.
+        """
+        if self.periodicity == "daily":
+            return day
+        return week_index(day)
+
+    def has_completion_in_period(self, completion: str) -> bool:
+        """
+        Return True if the day/ISO week of the given date is already checked off.
+        The set of occupied periods is built once and then kept up to date
+        by add_completion, so this is a set lookup.
+        """
+        if self._periods is None:
+            self._periods = {self.period_of(day) for day in self.ordinals}
+        return self.period_of(to_ordinal(completion)) in self._periods
+
     def add_completion(self, completion: str):
         """
         Add a completion date (as 'YYYY-MM-DD') to the habit history.
         """
-        self.completions.append(completion)          # append to list
+        day = to_ordinal(completion)
+        in_order = not self.ordinals or day >= self.ordinals[-1]
+        if in_order:
+            self.ordinals.append(day)                # usual case: newest date, O(1)
+        else:
+            insort(self.ordinals, day)               # backdated: keep the array sorted
+        if self._periods is not None:
+            self._periods.add(self.period_of(day))
+        if self.streak is not None:
+            self.streak = self._extend_streak(self.period_of(day)) if in_order else None
+
+    def _extend_streak(self, period):
+        """Return the streak state after appending one newer period."""
+        last_period, current_run, longest_run = self.streak
+        if last_period is not None and period - last_period == 1:
+            current_run += 1
+        else:
+            current_run = 1                          # gap → run starts again
+        return period, current_run, max(longest_run, current_run)
 
     def to_dict(self) -> dict:
         """
@@ -35,12 +96,21 @@ class Habit:
             dict: A plain dictionary version of the habit.
                   Matches the structure used in the JSON storage file.
         """
-        return {
+        data = {
             "name": self.name,
             "periodicity": self.periodicity,
             "created_at": self.created_at,
             "completions": self.completions,
         }
+        if self.streak is not None:
+            last_period, current_run, longest_run = self.streak
+            data["streak"] = {
+                "last_period": last_period,
+                "current": current_run,
+                "longest": longest_run,
+                "count": len(self.ordinals),         # lets the loader detect edited files
+            }
+        return data
 
 def habit_from_dict(data: dict) -> Habit:
     """
@@ -49,10 +119,109 @@ def habit_from_dict(data: dict) -> Habit:
         data (dict): A dictionary containing habit data.
     Returns:
         Habit: A new Habit instance with the loaded data.
+    Raises:
+        HabitFileError: If a completion is not a valid date.
+    """
+    completions = data.get("completions", [])       # list of completions
+    try:
+        habit = Habit(
+            name=data.get("name", ""),                   # default empty string if missing
+            periodicity=data.get("periodicity", "daily"),# assume daily if not given
+            created_at=data.get("created_at"),           # creation date
+            completions=completions,
+        )
+    except (ValueError, TypeError):
+        from habittracker.storage import HabitFileError   # storage imports this module
+        days = completions if isinstance(completions, list) else [completions]
+        bad = next((day for day in days if not valid_date(day)), completions)
+        raise HabitFileError(
+            f"Habit {data.get('name')!r} has an invalid completion date {bad!r} (file left unchanged)."
+        ) from None
+    streak = data.get("streak")
+    if streak and streak.get("count") == len(habit.ordinals):
+        last_period = habit.period_of(habit.ordinals[-1]) if habit.ordinals else None
+        if streak.get("last_period") == last_period:  # only trust it if it still matches
+            habit.streak = (last_period, streak["current"], streak["longest"])
+    return habit
+
+def valid_date(day) -> bool:
+    """Return True if day is a 'YYYY-MM-DD' string of a real date."""
+    try:
+        to_ordinal(day)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def name_key(name: str) -> str:
+    """
+    Normalize a habit name for lookups, so every operation matches names the same way.
+    Args:
+        name (str): A habit name as typed by the user.
+    Returns:
+        str: The name case-folded, with runs of whitespace collapsed to one space
+             and no leading or trailing spaces ('  Drink   WATER ' -> 'drink water').
     """
-    return Habit(
-        name=data.get("name", ""),                   # default empty string if missing
-        periodicity=data.get("periodicity", "daily"),# assume daily if not given
-        created_at=data.get("created_at"),           # creation date
-        completions=data.get("completions", []),     # list of completions
-    )
\ No newline at end of file
+    return " ".join(name.split()).casefold()
+
+def unique_name(name: str, taken) -> str:
+    """
+    Return the name, or 'name (2)', 'name (3)', ... if its name_key is already taken.
+    Args:
+        name (str): The wanted habit name.
+        taken: Name keys in use (anything that supports `in`).
+    Returns:
+        str: A name whose name_key is not in taken.
+    """
+    candidate, number = name, 2
+    while name_key(candidate) in taken:
+        candidate = f"{name} ({number})"
+        number += 1
+    return candidate
+
+class HabitIndex:
+    """
+    A collection of habits keyed by their normalized name (see name_key).
+    Keeps insertion order; lookup, membership tests, adding and removing are O(1).
+
+    Files written before name_key existed can hold names that now normalize
+    to the same key ('Drink  Water' and 'Drink Water'). No habit is dropped:
+    the later ones are renamed with unique_name and listed in `renamed`.
+    """
+    __slots__ = ("_habits", "renamed")
+
+    def __init__(self, habits=()):
+        self._habits = {}                            # name key -> Habit
+        self.renamed = []                            # (old name, new name) of colliding habits
+        for habit in habits:
+            key = name_key(habit.name)
+            if key in self._habits:
+                old_name = habit.name
+                habit.name = unique_name(old_name, self._habits)
+                self.renamed.append((old_name, habit.name))
+                key = name_key(habit.name)
+            self._habits[key] = habit
+
+    def __len__(self):
+        return len(self._habits)
+
+    def __iter__(self):
+        return iter(self._habits.values())
+
+    def __contains__(self, name):
+        return name_key(name) in self._habits
+
+    def get(self, name):
+        """Return the habit with this name (any case or spacing), or None."""
+        return self._habits.get(name_key(name))
+
+    def add(self, habit) -> bool:
+        """Add a habit. Returns False if a habit with the same name exists."""
+        key = name_key(habit.name)
+        if key in self._habits:
+            return False
+        self._habits[key] = habit
+        return True
+
+    def remove(self, name):
+        """Remove the habit with this name (any case or spacing). Returns it, or None."""
+        return self._habits.pop(name_key(name), None)
@@ -0,0 +1,91 @@
+"""
+Import completions (e.g. backfilled data from another tracker).
+
+Usage:
+    python -m habittracker.importer FILE [--format csv|jsonl] [--profile real|demo]
+    cat data.csv | python -m habittracker.importer - --format csv
+
+Input formats:
+- CSV:   two columns, habit name and date ('YYYY-MM-DD');
+         a header row "name,date" is skipped
+- JSONL: one object per line, {"name": "...", "date": "YYYY-MM-DD"}
+
+All rows go through domain.check_off_many: same rules as a normal
+check-off, but the profile is loaded and saved only once. Broken rows
+are reported and skipped; the exit code is 1 if any row was skipped.
+"""
+import argparse
+import csv
+import json
+import sys
+from habittracker.storage import HabitFileError, set_profile
+from habittracker.domain import check_off_many
+
+def read_csv(lines):
+    """Yield (name, date, error) rows from CSV lines; error is always None."""
+    for row in csv.reader(lines):
+        if not row or (row[0].strip().lower() == "name" and len(row) > 1 and row[1].strip().lower() == "date"):
+            continue  # empty line or header
+        yield row[0], row[1] if len(row) > 1 else "", None
+
+def read_jsonl(lines):
+    """
+    Yield (name, date, error) rows from JSON Lines.
+    error is None, or a message for a line that is not a JSON object.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield line.strip(), "", f"Invalid JSON on line {number}."
+            continue
+        if not isinstance(item, dict):
+            yield line.strip(), "", f"Invalid row on line {number}: expected a JSON object."
+            continue
+        yield item.get("name", ""), item.get("date", ""), None
+
+def detect_format(path):
+    """Guess the input format from the file name (CSV unless it ends in .jsonl/.json)."""
+    return "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+
+def import_completions(lines, fmt="csv"):
+    """
+    Check off every (name, date) row of the given lines.
+    Returns a list of ((name, date), (ok, message)) per row.
+    """
+    rows = list(read_jsonl(lines) if fmt == "jsonl" else read_csv(lines))
+    outcomes = iter(check_off_many([(name, day) for name, day, error in rows if error is None]))
+    return [((name, day), (False, error) if error else next(outcomes)) for name, day, error in rows]
+
+def main(argv=None):
+    """Run the import command. Returns the process exit code."""
+    parser = argparse.ArgumentParser(prog="python -m habittracker.importer", description=__doc__.split("\n")[1])
+    parser.add_argument("file", help="CSV or JSONL file, '-' for stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from file name)")
+    parser.add_argument("--profile", choices=["real", "demo"], default="real")
+    args = parser.parse_args(argv)
+
+    set_profile(args.profile)
+    try:
+        if args.file == "-":
+            results = import_completions(sys.stdin, args.format or "csv")
+        else:
+            with open(args.file, "r", newline="") as file:
+                results = import_completions(file, args.format or detect_format(args.file))
+    except HabitFileError as error:   # the profile's habits file is broken
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+    imported = 0
+    for (name, day), (ok, msg) in results:
+        if ok:
+            imported += 1
+        else:
+            print(f"Skipped {name} {day}: {msg}")
+    print(f"Imported {imported} of {len(results)} completions.")
+    return 0 if imported == len(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,15 +10,19 @@ Rules:
 - Weekly: one check-off per ISO week
 - No future dates
 """
+import sys
 from habittracker.time_utils import parse_iso
 from datetime import datetime
-from habittracker.storage import init_storage, set_profile, load_habits
+from habittracker.storage import HabitFileError, init_storage, set_profile
+from habittracker.repository import get_repository
 from habittracker.domain import add_habit, delete_habit, check_off, predefined_habits
 from habittracker.analytics import (
     list_all_habits, list_by_periodicity,
-    streak_summary_for, longest_daily_streak, longest_weekly_streak
+    streak_summary_for, longest_daily_streak, longest_weekly_streak, leaderboard
 )
 
+LEADERBOARD_SIZE = 5   # how many habits the leaderboard shows
+
 def pause():
     """Wait for user to press ENTER before continuing."""
     input("\nPress ENTER to continue...")
@@ -78,6 +82,24 @@ def show_habits(habits):
                 return index
         print("Invalid input. Try again.")
 
+def choose_leaderboard_metric():
+    """Ask how the leaderboard should rank habits."""
+    print("\nRank habits by:")
+    print("1) Longest streak")
+    print("2) Current streak")
+    print("3) Completion rate")
+
+    while True:
+        choice = input("Enter 1, 2 or 3: ").strip()
+        if choice == "1":
+            return "longest"
+        elif choice == "2":
+            return "current"
+        elif choice == "3":
+            return "rate"
+        else:
+            print("Invalid input. Please try again.")
+
 def choose_check_date():
     """Ask when to check off (today or custom date)."""
     print("\nWhen do you want to check off this habit?")
@@ -102,6 +124,18 @@ def choose_check_date():
 
 
 def run():
+    """
+    Run the main menu. Returns the exit code: 1 if the habits file
+    cannot be read (the message says why; the file is left unchanged).
+    """
+    try:
+        menu()
+    except HabitFileError as error:
+        print(f"Error: {error}")
+        return 1
+    return 0
+
+def menu():
     """Run the main menu loop."""
     print("Welcome to Habit Tracker!")
     choose_profile()
@@ -116,6 +150,7 @@ def run():
         print("5) Check off a habit")
         print("6) Show habit details")
         print("7) Show longest streaks")
+        print("8) Show leaderboard")
         print("0) Exit")
 
         choice = input("Enter choice: ").strip()
@@ -127,7 +162,7 @@ def run():
 
         # 1) List all habits
         elif choice == "1":
-            habits = load_habits()
+            habits = get_repository().all()
             pairs = list_all_habits(habits)
             print("\nAll habits:")
             if not pairs:
@@ -140,7 +175,7 @@ def run():
         # 2) List habits by periodicity
         elif choice == "2":
             period = choose_periodicity()
-            habits = load_habits()
+            habits = get_repository().all()
             filtered = list_by_periodicity(habits, period)
             print(f"\n{period.capitalize()} habits:")
             if not filtered:
@@ -195,7 +230,7 @@ def run():
 
         # 4) Delete habit
         elif choice == "4":
-            habits = load_habits()
+            habits = get_repository().all()
             index = show_habits(habits)
             if index is not None:
                 name = habits[index].name
@@ -205,7 +240,7 @@ def run():
 
         # 5) Check off habit
         elif choice == "5":
-            habits = load_habits()
+            habits = get_repository().all()
             index = show_habits(habits)
             if index is None:
                 pause()
@@ -223,7 +258,7 @@ def run():
 
         # 6) Habit details
         elif choice == "6":
-            habits = load_habits()
+            habits = get_repository().all()
             index = show_habits(habits)
             if index is None:
                 pause()
@@ -237,12 +272,12 @@ def run():
             print(f"Created at: {created.strftime('%Y-%m-%d')}")
             print(f"Current streak: {summary['current_streak']} {summary['unit']}")
             print(f"Longest streak: {summary['longest_streak']} {summary['unit']}")
-            print(f"Completions: {len(habit.completions)} times")
+            print(f"Completions: {len(habit.ordinals)} times")
             pause()
 
         # 7) Show longest streaks
         elif choice == "7":
-            habits = load_habits()
+            habits = get_repository().all()
             d_name, d_val, d_unit = longest_daily_streak(habits)
             w_name, w_val, w_unit = longest_weekly_streak(habits)
 
@@ -257,9 +292,24 @@ def run():
                 print("- Weekly: no weekly habits yet.")
             pause()
 
+        # 8) Leaderboard
+        elif choice == "8":
+            metric = choose_leaderboard_metric()
+            period = choose_periodicity()
+            top = leaderboard(get_repository().all(), LEADERBOARD_SIZE, by=metric, period=period)
+            print(f"\nTop {period} habits:")
+            if not top:
+                print("No habits of this type yet.")
+            for i, (name, value, unit) in enumerate(top, start=1):
+                if unit == "rate":
+                    print(f"{i}) {name}: {value:.0%} completed")
+                else:
+                    print(f"{i}) {name}: {value} {unit}")
+            pause()
+
         else:
             print("Invalid input. Please choose from the menu.")
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    sys.exit(run())
\ No newline at end of file
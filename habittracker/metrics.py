@@ -0,0 +1,204 @@
+"""
+Lightweight instrumentation for the hot paths (storage, domain, analytics).
+
+Per operation it records the number of calls, a latency histogram and the
+bytes read and written while the operation ran. Recording is off by default;
+then a decorated function costs one extra call and a flag check.
+
+    @timed("storage.load_habits")
+    def load_habits(): ...
+
+    with measure("import"):
+        ...
+
+Turn it on with enable() or the environment variable HABITTRACKER_METRICS=1.
+The command line can write a report on exit (--profile-report, see cli.py)
+as JSON or in the Prometheus text format, and run a command under cProfile.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("HABITTRACKER_METRICS") == "1"
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)   # upper bounds in seconds
+
+_stats = {}                   # operation name -> Stat
+_mutex = threading.Lock()
+_local = threading.local()    # .active: names of the operations running in this thread
+
+
+class Stat:
+    """Counters of one operation."""
+
+    __slots__ = ("count", "total", "buckets", "bytes_read", "bytes_written")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)   # the last one counts everything slower
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+def enable(enabled=True):
+    """Turn recording on or off."""
+    global ENABLED
+    ENABLED = enabled
+
+def reset():
+    """Forget everything recorded so far."""
+    with _mutex:
+        _stats.clear()
+
+def _stat(name):
+    stat = _stats.get(name)
+    if stat is None:
+        stat = _stats[name] = Stat()
+    return stat
+
+
+class _Measure:
+    """Context manager that times one operation (see measure)."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        active = getattr(_local, "active", None)
+        if active is None:
+            active = _local.active = []
+        active.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.active.pop()
+        with _mutex:
+            stat = _stat(self.name)
+            stat.count += 1
+            stat.total += elapsed
+            stat.buckets[bisect_left(BUCKETS, elapsed)] += 1
+        return False
+
+
+class _NoMeasure:
+    """Does nothing; returned by measure() while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_MEASURE = _NoMeasure()
+
+
+def measure(name):
+    """Return a context manager that records the time spent in the block under `name`."""
+    return _Measure(name) if ENABLED else _NO_MEASURE
+
+def timed(name):
+    """Decorator: record every call of the function under `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def add_bytes(read=0, written=0):
+    """
+    Count bytes read or written, for the innermost operation running in
+    this thread ('other' if none). Callers check ENABLED first.
+    """
+    active = getattr(_local, "active", None)
+    with _mutex:
+        stat = _stat(active[-1] if active else "other")
+        stat.bytes_read += read
+        stat.bytes_written += written
+
+
+def snapshot():
+    """
+    Return the recorded stats as a dict:
+    {operation: {count, total_seconds, mean_seconds, buckets, bytes_read, bytes_written}}.
+    buckets maps each upper bound ('+Inf' for the rest) to the number of calls in it.
+    """
+    with _mutex:
+        result = {}
+        for name, stat in sorted(_stats.items()):
+            bounds = [str(bound) for bound in BUCKETS] + ["+Inf"]
+            result[name] = {
+                "count": stat.count,
+                "total_seconds": stat.total,
+                "mean_seconds": stat.total / stat.count if stat.count else 0.0,
+                "buckets": dict(zip(bounds, stat.buckets)),
+                "bytes_read": stat.bytes_read,
+                "bytes_written": stat.bytes_written,
+            }
+        return result
+
+def report_json():
+    """Return the stats as JSON text."""
+    return json.dumps(snapshot(), indent=2)
+
+def report_prometheus():
+    """Return the stats in the Prometheus text exposition format."""
+    stats = snapshot()
+    lines = [
+        "# HELP habittracker_operation_seconds Time spent per operation.",
+        "# TYPE habittracker_operation_seconds histogram",
+    ]
+    for name, stat in stats.items():
+        cumulative = 0
+        for bound, count in stat["buckets"].items():
+            cumulative += count
+            lines.append(f'habittracker_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'habittracker_operation_seconds_sum{{operation="{name}"}} {stat["total_seconds"]}')
+        lines.append(f'habittracker_operation_seconds_count{{operation="{name}"}} {stat["count"]}')
+    for kind in ("read", "written"):
+        lines.append(f"# HELP habittracker_bytes_{kind}_total Bytes {kind} per operation.")
+        lines.append(f"# TYPE habittracker_bytes_{kind}_total counter")
+        for name, stat in stats.items():
+            lines.append(f'habittracker_bytes_{kind}_total{{operation="{name}"}} {stat["bytes_" + kind]}')
+    return "\n".join(lines) + "\n"
+
+def write_report(path, fmt="json"):
+    """Write the report ('json' or 'prometheus') to a file, or to stderr if path is '-'."""
+    text = report_prometheus() if fmt == "prometheus" else report_json() + "\n"
+    if path == "-":
+        import sys
+        sys.stderr.write(text)
+    else:
+        with open(path, "w") as file:
+            file.write(text)
+
+
+def run_profiled(func, output="-", *args, **kwargs):
+    """
+    Run func(*args, **kwargs) under cProfile and return its result.
+    The stats are saved to `output` (for pstats / snakeviz), or the 25
+    most expensive functions are printed to stderr if output is '-'.
+    """
+    import cProfile
+    import pstats
+    import sys
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        if output == "-":
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+        else:
+            profiler.dump_stats(output)
@@ -0,0 +1,35 @@
+"""
+Import existing JSON profiles into SQLite databases.
+
+Usage:
+    python -m habittracker.migrate            # habits.json and demo_user_habits.json
+    python -m habittracker.migrate FILE.json  # any other JSON profile file
+"""
+import os
+import sys
+from habittracker.storage import REAL_FILE, DEMO_FILE
+from habittracker.sqlite_storage import SqliteBackend, db_path_for
+
+def migrate(json_path):
+    """
+    Import one JSON profile file into its SQLite database (FILE.json -> FILE.db).
+    Returns the number of imported habits.
+    """
+    backend = SqliteBackend(db_path_for(json_path))
+    try:
+        return backend.import_json(json_path)
+    finally:
+        backend.close()
+
+def main(argv=None):
+    """Migrate the given files, or both default profiles."""
+    paths = argv if argv else [REAL_FILE, DEMO_FILE]
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Skipping {path} (not found).")
+            continue
+        count = migrate(path)
+        print(f"Imported {count} habits from {path} into {db_path_for(path)}.")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
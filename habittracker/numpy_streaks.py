@@ -0,0 +1,41 @@
+"""
+Optional NumPy engine for streak calculations.
+Importing this module raises ImportError when NumPy is not installed;
+analytics.py then falls back to the pure-Python functions.
+
+Every habit is turned into a sorted array of period numbers (day numbers
+for daily habits, week numbers for weekly habits) where consecutive
+periods differ by exactly 1. A run breaks wherever np.diff is not 1.
+"""
+import numpy as np
+
+
+def batch_runs(period_arrays):
+    """
+    Count (current_run, longest_run) for many habits in one call.
+    Args:
+        period_arrays (list): One sorted sequence of period numbers per habit.
+    Returns:
+        list[tuple[int, int]]: (current_run, longest_run) per habit, in the same order.
+    """
+    count = len(period_arrays)
+    sizes = np.fromiter((len(a) for a in period_arrays), dtype=np.int64, count=count)
+    current = np.zeros(count, dtype=np.int64)
+    longest = np.zeros(count, dtype=np.int64)
+    if sizes.sum() == 0:
+        return list(zip(current.tolist(), longest.tolist()))
+
+    values = np.concatenate([np.asarray(a, dtype=np.int64) for a in period_arrays])
+    owner = np.repeat(np.arange(count), sizes)        # habit index of every value
+
+    # a new run starts at the first value of a habit, or where the gap is not exactly 1
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = (np.diff(values) != 1) | (owner[1:] != owner[:-1])
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, len(values)))
+    run_owner = owner[run_starts]
+
+    np.maximum.at(longest, run_owner, run_lengths)
+    is_last = np.append(run_owner[1:] != run_owner[:-1], True)   # last run of each habit
+    current[run_owner[is_last]] = run_lengths[is_last]
+    return list(zip(current.tolist(), longest.tolist()))
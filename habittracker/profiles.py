@@ -0,0 +1,118 @@
+"""
+Per-user profiles, for serving many users from one process.
+
+Each user gets an isolated store inside a root directory. Stores are
+sharded into sub-directories so no single directory gets too many files:
+    <root>/<first 2 hex digits of sha1(user)>/<user>.json   (or .db for SQLite, .htsnap for binary snapshots)
+
+A ProfileRegistry opens profiles on demand and keeps at most `max_open`
+of them open; the least recently used one is closed first. The registry
+can be used from several threads.
+
+Pass a Profile to the domain functions (profile=...) instead of relying
+on the module-level profile selected with storage.set_profile().
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from habittracker.storage import JsonBackend
+from habittracker.repository import HabitRepository, get_repository
+
+USER_NAME = re.compile(r"[A-Za-z0-9_.@-]{1,64}")   # allowed user names (safe as file names)
+
+
+class Profile:
+    """One user's store: the storage backend and its cached repository."""
+
+    def __init__(self, name, backend, repository=None):
+        self.name = name
+        self.backend = backend
+        self.repository = repository or HabitRepository(backend)
+        self.write_lock = None   # asyncio.Lock of the HTTP server (server.py), made on first write
+
+    def habits(self):
+        """Return the user's habits (cached, see HabitRepository) for analytics.py."""
+        return self.repository.all()
+
+    def close(self):
+        """Release the backend's open handles (waits for running operations)."""
+        self.repository.close()
+
+    def __repr__(self):
+        return f"Profile({self.name!r}, {self.backend.path!r})"
+
+
+def default_profile():
+    """Return the profile selected by storage.set_profile() (used by the interactive CLI)."""
+    repo = get_repository()
+    return Profile("default", repo.backend, repo)
+
+
+class ProfileRegistry:
+    """Opens per-user profiles on demand, keeping an LRU-bounded pool of open ones."""
+
+    def __init__(self, root, backend="json", max_open=128, journal=False):
+        """
+        Args:
+            root (str): Directory holding all user stores (created if missing).
+            backend (str): 'json', 'sqlite' or 'binary'.
+            max_open (int): How many profiles may be open at the same time.
+            journal (bool): Use the append-only journal (JSON backend only).
+        """
+        if backend not in ("json", "sqlite", "binary"):
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self.root = root
+        self.backend = backend
+        self.max_open = max_open
+        self.journal = journal
+        self._open = OrderedDict()      # user -> Profile, least recently used first
+        self._mutex = threading.Lock()
+
+    def path_for(self, user):
+        """Return the JSON file of a user (the SQLite backend uses the same name with .db)."""
+        if not USER_NAME.fullmatch(user) or user.startswith("."):
+            raise ValueError(f"Invalid user name: {user!r}")
+        shard = hashlib.sha1(user.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root, shard, user + ".json")
+
+    def _open_backend(self, user):
+        """Create the storage backend of a user, making its shard directory."""
+        path = self.path_for(user)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.backend == "sqlite":
+            from habittracker.sqlite_storage import SqliteBackend, db_path_for
+            return SqliteBackend(db_path_for(path))
+        if self.backend == "binary":
+            from habittracker.binary_storage import BinaryBackend, snapshot_path_for
+            return BinaryBackend(snapshot_path_for(path))
+        return JsonBackend(path, journal=self.journal)
+
+    def get(self, user):
+        """Return the profile of a user, opening it if needed."""
+        evicted = []
+        with self._mutex:
+            profile = self._open.get(user)
+            if profile is not None:
+                self._open.move_to_end(user)   # most recently used
+                return profile
+            profile = Profile(user, self._open_backend(user))
+            self._open[user] = profile
+            while len(self._open) > self.max_open:
+                evicted.append(self._open.popitem(last=False)[1])
+        for oldest in evicted:
+            oldest.close()    # outside the registry lock: may wait for a running operation
+        return profile
+
+    def open_count(self):
+        """Return how many profiles are open right now."""
+        return len(self._open)
+
+    def close(self):
+        """Close all open profiles."""
+        with self._mutex:
+            profiles = list(self._open.values())
+            self._open.clear()
+        for profile in profiles:
+            profile.close()
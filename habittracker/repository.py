@@ -0,0 +1,183 @@
+"""
+In-memory habit repository shared by domain.py and main.py.
+
+The parsed habits of a profile are kept in memory in a HabitIndex,
+keyed by the normalized habit name (see habit.name_key). They are
+reloaded only when the storage file has changed on disk (modification
+time or size), and every change is written through to the storage
+backend right away.
+Habits whose stored names collide under name_key are renamed on load
+(see HabitIndex); the next write saves all habits so the renames reach
+the storage too.
+Backends with indexed lookups (StorageBackend.indexed, e.g. SQLite) are
+not loaded in full for single-habit operations: get, add, delete and
+check-offs load just the habit they need (backend.get_habit) and keep it
+until the stamp changes. all() still loads everything.
+A repository can be shared by several threads.
+"""
+import threading
+from contextlib import contextmanager
+from habittracker.habit import HabitIndex
+from habittracker.storage import get_backend
+
+_repositories = {}   # backend -> HabitRepository
+
+
+def get_repository():
+    """Return the shared repository for the current profile and backend."""
+    backend = get_backend()
+    repo = _repositories.get(backend)
+    if repo is None:
+        repo = HabitRepository(backend)
+        _repositories[backend] = repo
+    return repo
+
+
+class HabitRepository:
+    """
+    Cached view of the habits stored in one backend.
+    Changes (add, delete, add_completion, save_completions) should be made
+    inside a `with repo.locked():` block.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._habits = None    # HabitIndex of all stored habits, once loaded
+        self._single = HabitIndex()   # habits loaded one at a time (indexed backends only)
+        self._stamp = None     # backend stamp of the data we hold
+        self._rewrite = False  # True while renamed habits (see HabitIndex.renamed) are not saved yet
+        self._mutex = threading.RLock()   # guards the cache between threads
+        self.listeners = []    # called as listener(events) after every successful write
+
+    @contextmanager
+    def locked(self):
+        """
+        Lock the profile for a read-modify-write sequence, against other
+        threads and (see StorageBackend.lock) other processes.
+        Reads inside the block see the latest data, since the cache is
+        checked against the file on every access.
+        """
+        with self._mutex, self.backend.lock():
+            yield
+
+    @contextmanager
+    def reading(self):
+        """
+        Keep the writers of this process out while the block reads habits.
+        Analytics cache streak state on the habit objects, so they must not
+        run while another thread adds completions to the same habits.
+        """
+        with self._mutex:
+            yield
+
+    def close(self):
+        """Close the backend once no other thread is using it, and forget the cache."""
+        with self._mutex:
+            self.backend.close()
+            self.invalidate()
+
+    def invalidate(self):
+        """Forget the cached habits; the next access reloads them from storage."""
+        self._habits = None
+        self._single = HabitIndex()
+
+    def refresh(self):
+        """Reload from storage if the data changed on disk since the last read."""
+        with self._mutex:
+            stamp = self.backend.stamp()
+            if self._habits is None or stamp != self._stamp:
+                self._habits = HabitIndex(self.backend.load_habits())
+                self._single = HabitIndex()
+                self._rewrite = bool(self._habits.renamed)
+                # The stamp from before the load: if another process writes while we
+                # load, the stamps differ and the next access reloads. If loading
+                # created the file (SQLite), the next access also reloads, once.
+                self._stamp = stamp
+
+    def all(self):
+        """Return all habits as a list, in insertion order."""
+        with self._mutex:
+            self.refresh()
+            return list(self._habits)
+
+    def get(self, name):
+        """Return the habit with this name (see name_key), or None."""
+        with self._mutex:
+            return self._lookup(name)[1]
+
+    def _lookup(self, name):
+        """
+        Return (the HabitIndex that holds the habit, the habit or None),
+        loading only this habit if the backend has indexed lookups.
+        """
+        if not self.backend.indexed:
+            self.refresh()
+            return self._habits, self._habits.get(name)
+        stamp = self.backend.stamp()
+        if stamp != self._stamp:                       # changed elsewhere: forget everything
+            self.invalidate()
+            self._stamp = stamp
+        if self._habits is not None:
+            return self._habits, self._habits.get(name)
+        habit = self._single.get(name)
+        if habit is None:
+            habit = self.backend.get_habit(name)       # index query, see sqlite_storage.py
+            if habit is not None:
+                self._single.add(habit)
+        return self._single, habit
+
+    def _write(self, event):
+        """Write one change through to the backend and remember the new stamp."""
+        self._write_many([event])
+
+    def _write_many(self, events):
+        """Write several changes through to the backend in one go."""
+        try:
+            if self._rewrite:
+                # the stored names still collide, so save everything instead of single changes
+                self.backend.save_habits(list(self._habits))
+                self._rewrite = False
+            else:
+                self.backend.save_changes(self._habits, events)
+        except Exception:
+            self.invalidate()   # drop the cache so the next read reloads from disk
+            raise
+        self._stamp = self.backend.stamp()
+        for listener in self.listeners:
+            listener(events)
+
+    def add(self, habit):
+        """Store a new habit. Returns False if the name is already used."""
+        habits, existing = self._lookup(habit.name)
+        if existing is not None:
+            return False
+        habits.add(habit)
+        self._write({"op": "add", "habit": habit.to_dict()})
+        return True
+
+    def delete(self, name):
+        """Remove a habit by its name (see name_key). Returns True if deleted."""
+        habits, habit = self._lookup(name)
+        if habit is None:
+            return False
+        habits.remove(name)
+        self._write({"op": "delete", "name": habit.name})   # events always carry the stored name
+        return True
+
+    def add_completion(self, habit, completion):
+        """Record a completion date ('YYYY-MM-DD') for a stored habit."""
+        habit.add_completion(completion)
+        self._write({"op": "complete", "name": habit.name, "date": completion})
+
+    def save_completions(self, pairs):
+        """
+        Write many completions with a single write. The completions must
+        already be added to the habits (Habit.add_completion), e.g. while
+        validating a batch.
+        Args:
+            pairs (list[tuple[Habit, str]]): Stored habits and their new 'YYYY-MM-DD' dates.
+        """
+        if pairs:
+            self._write_many([
+                {"op": "complete", "name": habit.name, "date": completion} for habit, completion in pairs
+            ])
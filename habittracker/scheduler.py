@@ -0,0 +1,293 @@
+"""
+Due-habit scheduler: which habits are still due today (daily) or this ISO
+week (weekly), and which streaks break at midnight if nothing happens.
+
+A Scheduler keeps two structures instead of scanning every habit:
+- habits already done for their current period wait in a heap, ordered by
+  the day their next period starts (when they become due again)
+- due habits are grouped by their deadline (the last day of the period)
+Updating one habit (e.g. after a check-off) costs O(log n); the queries cost
+O(log n) plus the number of habits they return. Attach a scheduler to a
+HabitRepository to have every change applied to it.
+
+As a long-lived process it sends notifications to a hook:
+    python -m habittracker.scheduler [--profile real|demo] [--hook HOOK]
+        [--interval SECONDS] [--remind-at HH:MM] [--once]
+HOOK is 'stdout' (default), 'file:PATH' (appends JSON lines) or
+'command:CMD' (runs CMD with the notification as JSON on stdin).
+Notifications: {"event": "due" | "breaks_tonight", "name", "periodicity",
+"deadline": "YYYY-MM-DD", "streak"}.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from habittracker.habit import name_key
+from habittracker.time_utils import from_ordinal, week_start
+
+
+def period_bounds(periodicity, day):
+    """Return (first day, last day) of the day or Monday-based ISO week containing a day number."""
+    if periodicity == "daily":
+        return day, day
+    first = week_start(day)
+    return first, first + 6
+
+
+class Scheduler:
+    """Priority queue of habits by the time they are next due."""
+
+    def __init__(self, habits=(), today=None):
+        """
+        Args:
+            habits (iterable[Habit]): The habits to schedule (kept by reference).
+            today (date, optional): The current day (default: today).
+        """
+        self.today = (today or date.today()).toordinal()
+        self._habits = {}          # name key -> Habit
+        self._waiting = []         # heap of (due day, entry number, name key) for habits done this period
+        self._entry = {}           # name key -> number of its live entry in _waiting (older ones are stale)
+        self._due = {}             # name key -> deadline day, for habits due now
+        self._by_deadline = {}     # deadline day -> {name key: None}, insertion ordered
+        self._at_risk = {}         # deadline day -> {name key: None} of due habits with a running streak
+        self._deadlines = []       # heap of the deadline days in _by_deadline (may hold stale days)
+        self._counter = itertools.count()
+        self._repo = None
+        for habit in habits:
+            self.update(habit)
+
+    def __len__(self):
+        return len(self._habits)
+
+    def update(self, habit):
+        """Schedule a new habit, or reschedule one after a change (e.g. a check-off). O(log n)."""
+        key = name_key(habit.name)
+        self._discard(key)
+        self._habits[key] = habit
+        self._place(key)
+
+    def remove(self, name):
+        """Stop scheduling a habit."""
+        key = name_key(name)
+        self._discard(key)
+        self._habits.pop(key, None)
+
+    def sync(self, habits):
+        """
+        Bring the schedule in line with a fresh copy of all habits, e.g. after
+        another process changed the profile. Only habits whose last completion
+        or periodicity changed are rescheduled (O(n) plus O(log n) per change).
+        Returns the habits that became due (e.g. new habits).
+        """
+        became_due = []
+        seen = set()
+        for habit in habits:
+            key = name_key(habit.name)
+            seen.add(key)
+            old = self._habits.get(key)
+            if old is not None and old.periodicity == habit.periodicity \
+                    and old.ordinals[-1:] == habit.ordinals[-1:]:
+                self._habits[key] = habit                  # same place in the schedule
+                continue
+            was_due = key in self._due
+            self.update(habit)
+            if key in self._due and not was_due:
+                became_due.append(habit)
+        for key in [key for key in self._habits if key not in seen]:
+            self._discard(key)
+            del self._habits[key]
+        return became_due
+
+    def _discard(self, key):
+        """Take a habit out of the queue (its heap entry becomes stale)."""
+        self._entry.pop(key, None)
+        deadline = self._due.pop(key, None)
+        if deadline is not None:
+            for groups in (self._by_deadline, self._at_risk):
+                bucket = groups.get(deadline)
+                if bucket is not None and key in bucket:
+                    del bucket[key]
+                    if not bucket:
+                        del groups[deadline]
+
+    def _place(self, key):
+        """Put a habit in the waiting heap or in its deadline group, from its completions."""
+        habit = self._habits[key]
+        first, last = period_bounds(habit.periodicity, self.today)
+        if habit.ordinals and habit.ordinals[-1] >= first:   # done for the current period
+            entry = next(self._counter)
+            self._entry[key] = entry
+            heapq.heappush(self._waiting, (last + 1, entry, key))
+            return
+        self._due[key] = last
+        bucket = self._by_deadline.get(last)
+        if bucket is None:
+            bucket = self._by_deadline[last] = {}
+            heapq.heappush(self._deadlines, last)
+        bucket[key] = None
+        step = 1 if habit.periodicity == "daily" else 7
+        if habit.ordinals and habit.ordinals[-1] >= first - step:   # done in the previous period
+            self._at_risk.setdefault(last, {})[key] = None
+
+    def advance(self, today=None):
+        """
+        Move the clock to a new day. Returns the habits that became due since
+        the last call: a new period started, or a period ended without a check-off.
+        """
+        self.today = (today or date.today()).toordinal()
+        became_due = []
+        while self._waiting and self._waiting[0][0] <= self.today:
+            _, entry, key = heapq.heappop(self._waiting)
+            if self._entry.get(key) != entry:
+                continue                                   # stale: habit changed or removed
+            del self._entry[key]
+            self._place(key)
+            became_due.append(key)
+        while self._deadlines and self._deadlines[0] < self.today:
+            deadline = heapq.heappop(self._deadlines)
+            self._at_risk.pop(deadline, None)
+            missed = self._by_deadline.pop(deadline, {})
+            for key in missed:
+                del self._due[key]
+                self._place(key)                           # due again, for the new period
+                became_due.append(key)
+        return [self._habits[key] for key in became_due if key in self._due]
+
+    def is_due(self, name):
+        """Return True if the habit still has to be done in the current period. O(1)."""
+        return name_key(name) in self._due
+
+    def due_now(self):
+        """Return the due habits, the most urgent deadline first."""
+        return [self._habits[key] for deadline in sorted(self._by_deadline) for key in self._by_deadline[deadline]]
+
+    def breaking_tonight(self):
+        """
+        Return the due habits whose streak breaks at midnight: due daily
+        habits (or weekly ones on Sunday) that were done in the previous period.
+        """
+        return [self._habits[key] for key in self._at_risk.get(self.today, ())]
+
+    def next_due(self):
+        """Return (day number, habit) of the next habit to become due, or None. O(log n)."""
+        while self._waiting:
+            day, entry, key = self._waiting[0]
+            if self._entry.get(key) == entry:
+                return day, self._habits[key]
+            heapq.heappop(self._waiting)                   # drop stale entries on the way
+        return None
+
+    def deadline_of(self, habit):
+        """Return the deadline day number of a due habit."""
+        return self._due[name_key(habit.name)]
+
+    def attach(self, repo):
+        """Keep the scheduler up to date with every change written through a HabitRepository."""
+        self._repo = repo
+        repo.listeners.append(self.on_events)
+
+    def on_events(self, events):
+        """Apply repository events (add, delete, complete) to the schedule."""
+        for event in events:
+            name = event["habit"]["name"] if event.get("op") == "add" else event.get("name")
+            habit = self._repo.get(name)
+            if habit is None:
+                self.remove(name)
+            else:
+                self.update(habit)
+
+
+# Notification hooks and the long-lived process
+
+def make_hook(spec):
+    """Return a function that delivers one notification dict, for a hook spec (see module docstring)."""
+    kind, _, target = spec.partition(":")
+    if kind == "stdout":
+        def to_stdout(note):
+            print(json.dumps(note), flush=True)
+        return to_stdout
+    if kind == "file" and target:
+        def to_file(note):
+            with open(target, "a") as file:
+                file.write(json.dumps(note) + "\n")
+        return to_file
+    if kind == "command" and target:
+        def to_command(note):
+            subprocess.run(target, shell=True, input=json.dumps(note), text=True, check=False)
+        return to_command
+    raise ValueError(f"Unknown notification hook: {spec}")
+
+def notification(scheduler, habit, event):
+    """Build the notification dict for a due habit."""
+    from habittracker.analytics import streak_summary_for
+    return {
+        "event": event,
+        "name": habit.name,
+        "periodicity": habit.periodicity,
+        "deadline": from_ordinal(scheduler.deadline_of(habit)),
+        "streak": streak_summary_for(habit)["current_streak"] if event == "breaks_tonight" else None,
+    }
+
+def run(repo, notify, interval=60, remind_at=None, once=False):
+    """
+    Send notifications for the habits of a repository until interrupted.
+    All due habits are reported at start, then each habit when it becomes due.
+    At remind_at (a datetime.time) the streaks that break at midnight are reported, once a day.
+    Changes made by other processes are picked up with Scheduler.sync (see poll).
+    """
+    scheduler = Scheduler(repo.all())
+    stamp = repo.backend.stamp()
+    for habit in scheduler.due_now():
+        notify(notification(scheduler, habit, "due"))
+    reminded = None
+    while True:
+        now = datetime.now()
+        if once or (remind_at is not None and now.time() >= remind_at and reminded != now.date()):
+            for habit in scheduler.breaking_tonight():
+                notify(notification(scheduler, habit, "breaks_tonight"))
+            reminded = now.date()
+        if once:
+            return
+        time.sleep(interval)
+        stamp = poll(scheduler, repo, stamp, notify)
+
+def poll(scheduler, repo, stamp, notify, today=None):
+    """
+    One step of run(): move the scheduler to today, then apply changes made
+    by other processes (e.g. a check-off from the command line) if the
+    storage stamp differs. Sends a "due" notification for every habit that
+    became due. Returns the storage stamp the scheduler now matches.
+    """
+    for habit in scheduler.advance(today):      # first, so habits that rolled over are reported
+        notify(notification(scheduler, habit, "due"))
+    if repo.backend.stamp() != stamp:
+        stamp = repo.backend.stamp()
+        for habit in scheduler.sync(repo.all()):
+            notify(notification(scheduler, habit, "due"))
+    return stamp
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m habittracker.scheduler", description="Habit reminder process.")
+    parser.add_argument("--profile", choices=["real", "demo"], default="real")
+    parser.add_argument("--hook", default="stdout", help="stdout, file:PATH or command:CMD")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between checks")
+    parser.add_argument("--remind-at", help="HH:MM to report streaks that break at midnight")
+    parser.add_argument("--once", action="store_true", help="report what is due now and exit")
+    args = parser.parse_args(argv)
+    from habittracker.storage import init_storage, set_profile
+    from habittracker.repository import get_repository
+    set_profile(args.profile)
+    init_storage()
+    remind_at = datetime.strptime(args.remind_at, "%H:%M").time() if args.remind_at else None
+    try:
+        run(get_repository(), make_hook(args.hook), args.interval, remind_at, args.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
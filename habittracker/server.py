@@ -0,0 +1,283 @@
+"""
+Local HTTP/JSON server, so several clients (a dashboard, phone shortcuts)
+can use the tracker at the same time.
+
+Built on asyncio from the standard library. Storage work runs in a thread
+pool so the event loop never waits on disk. Changes to one profile are
+serialized (one writer per profile at a time), and streak reads hold the
+profile's repository (HabitRepository.reading) so they never see a habit
+that a check-off is changing.
+Profiles come from a ProfileRegistry (see profiles.py).
+
+Usage:
+    python -m habittracker.server --root DIR [--host 127.0.0.1] [--port 8080]
+
+Endpoints (bodies and responses are JSON):
+    GET    /profiles/USER/habits[?period=daily|weekly]   list habits
+    POST   /profiles/USER/habits                         {"name": ..., "periodicity": ...}
+    GET    /profiles/USER/habits/NAME                    habit details and streaks
+    DELETE /profiles/USER/habits/NAME                    delete a habit
+    POST   /profiles/USER/habits/NAME/check              {"date": "YYYY-MM-DD"} (optional)
+    GET    /profiles/USER/streaks[?top=K&by=longest|current|rate&period=...]
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit, parse_qs
+from habittracker import analytics
+from habittracker.domain import add_habit, delete_habit, check_off
+from habittracker.profiles import ProfileRegistry
+from habittracker.time_utils import parse_iso
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+MAX_BODY = 1 << 20   # largest accepted request body, in bytes
+
+
+class HttpError(Exception):
+    """Stops a request with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# The operations, run in the thread pool. Each returns (status, JSON-able body).
+
+def list_habits(profile, period=None):
+    with profile.repository.reading():
+        habits = profile.habits()
+        if period:
+            habits = analytics.list_by_periodicity(habits, period)
+        return 200, [{"name": name, "periodicity": p} for name, p in analytics.list_all_habits(habits)]
+
+def show_habit(profile, name):
+    with profile.repository.reading():
+        habit = profile.repository.get(name)
+        if habit is None:
+            raise HttpError(404, "Habit not found.")
+        summary = analytics.streak_summary_for(habit)
+        return 200, {
+            "name": habit.name,
+            "periodicity": habit.periodicity,
+            "created_at": habit.created_at,
+            "current_streak": summary["current_streak"],
+            "longest_streak": summary["longest_streak"],
+            "unit": summary["unit"],
+            "completions": len(habit.ordinals),
+        }
+
+def create_habit(profile, data):
+    name = data.get("name")
+    periodicity = data.get("periodicity", "daily")
+    if not isinstance(name, str) or not name.strip() or periodicity not in ("daily", "weekly"):
+        raise HttpError(400, "Expected {\"name\": ..., \"periodicity\": \"daily\"|\"weekly\"}.")
+    if not add_habit(name, periodicity, profile=profile):
+        raise HttpError(409, "Habit already exists.")
+    return 201, {"name": name.strip(), "periodicity": periodicity}
+
+def remove_habit(profile, name):
+    habit = profile.repository.get(name)
+    if habit is None or not delete_habit(habit.name, profile=profile):
+        raise HttpError(404, "Habit not found.")
+    return 200, {"name": habit.name}
+
+def check_habit(profile, name, data):
+    when = None
+    if data.get("date"):
+        try:
+            when = parse_iso(str(data["date"]))
+        except ValueError:
+            raise HttpError(400, "Invalid date.")
+    ok, msg = check_off(name, when, profile=profile)
+    if not ok:
+        raise HttpError(404 if msg == "Habit not found." else 409, msg)
+    return 200, {"name": name, "message": msg}
+
+def streaks(profile, top=None, by="longest", period=None):
+    with profile.repository.reading():
+        habits = profile.habits()
+        if top:
+            rows = analytics.leaderboard(habits, top, by=by, period=period)
+            return 200, [{"name": name, "value": value, "unit": unit} for name, value, unit in rows]
+        result = {}
+        for p in ("daily", "weekly"):
+            name, value, unit = analytics.longest_streak(habits, p)
+            result[p] = {"name": name, "streak": value, "unit": unit}
+        return 200, result
+
+
+class HabitServer:
+    """Serves the habit operations of a ProfileRegistry over HTTP."""
+
+    def __init__(self, registry, workers=8):
+        self.registry = registry
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="habit-io")
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start listening; returns the asyncio server (port 0 picks a free port)."""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        """Stop the worker threads and close the open profiles."""
+        self.pool.shutdown(wait=True)
+        self.registry.close()
+
+    async def run_io(self, func, *args):
+        """Run a blocking storage operation in the thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.respond(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except HttpError as error:   # malformed request line or headers
+            writer.write(encode_response(error.status, {"ok": False, "error": str(error)}, False))
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, body):
+        """Route one request and turn errors into JSON responses."""
+        try:
+            status, result = await self.dispatch(method, target, body)
+            return status, {"ok": True, "result": result}
+        except HttpError as error:
+            return error.status, {"ok": False, "error": str(error)}
+        except Exception as error:   # keep serving other requests
+            return 500, {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+    async def dispatch(self, method, target, body):
+        """Find the operation for a request and run it."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        if len(parts) < 3 or parts[0] != "profiles":
+            raise HttpError(404, "Unknown path.")
+        try:
+            profile = await self.run_io(self.registry.get, parts[1])
+        except ValueError as error:
+            raise HttpError(400, str(error))
+        route = parts[2:]
+        data = parse_body(body)
+
+        if route == ["habits"] and method == "GET":
+            return await self.run_io(list_habits, profile, query.get("period"))
+        if route == ["habits"] and method == "POST":
+            return await self.write(profile, create_habit, profile, data)
+        if len(route) == 2 and route[0] == "habits" and method == "GET":
+            return await self.run_io(show_habit, profile, route[1])
+        if len(route) == 2 and route[0] == "habits" and method == "DELETE":
+            return await self.write(profile, remove_habit, profile, route[1])
+        if len(route) == 3 and route[0] == "habits" and route[2] == "check" and method == "POST":
+            return await self.write(profile, check_habit, profile, route[1], data)
+        if route == ["streaks"] and method == "GET":
+            top = query.get("top")
+            if top is not None and not top.isdigit():
+                raise HttpError(400, "top must be a number.")
+            by = query.get("by", "longest")
+            if by not in ("longest", "current", "rate"):
+                raise HttpError(400, "by must be longest, current or rate.")
+            return await self.run_io(streaks, profile, int(top) if top else None, by, query.get("period"))
+        if route[0] in ("habits", "streaks"):
+            raise HttpError(405, "Method not allowed.")
+        raise HttpError(404, "Unknown path.")
+
+    async def write(self, profile, func, *args):
+        """
+        Run a change in the thread pool, one at a time per profile.
+        The lock lives on the Profile, so it goes away when the registry evicts it.
+        """
+        if profile.write_lock is None:
+            profile.write_lock = asyncio.Lock()
+        async with profile.write_lock:
+            return await self.run_io(func, *args)
+
+
+async def read_request(reader):
+    """
+    Read one HTTP request. Returns (method, target, headers, body),
+    or None when the client closed the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = headers.get("content-length", "0")
+    if not length.isdigit() or int(length) > MAX_BODY:
+        raise HttpError(400, "Bad Content-Length.")
+    body = await reader.readexactly(int(length)) if int(length) else b""
+    return method.upper(), target, headers, body
+
+def parse_body(body):
+    """Decode a JSON object request body (empty body = {})."""
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HttpError(400, "Body must be JSON.")
+    if not isinstance(data, dict):
+        raise HttpError(400, "Body must be a JSON object.")
+    return data
+
+def encode_response(status, payload, keep_alive=True):
+    """Build the bytes of a JSON HTTP response."""
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(root, host="127.0.0.1", port=8080, backend="json", workers=8):
+    """Run the server until it is cancelled."""
+    app = HabitServer(ProfileRegistry(root, backend=backend), workers=workers)
+    server = await app.start(host, port)
+    print(f"Habit Tracker server on http://{host}:{server.sockets[0].getsockname()[1]} (profiles in {root})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m habittracker.server", description="Habit Tracker HTTP server.")
+    parser.add_argument("--root", required=True, help="directory for the user profiles")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--backend", choices=["json", "sqlite", "binary"], default="json")
+    parser.add_argument("--workers", type=int, default=8, help="threads for disk I/O")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.root, args.host, args.port, args.backend, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+SQLite storage backend.
+Each profile uses its own database file (habits.json -> habits.db).
+
+Tables:
+- habits:      one row per habit
+- completions: one row per completion date, indexed on (habit_id, date)
+so per-habit lookups are index queries instead of loading the whole
+profile.
+"""
+import json
+import os
+import sqlite3
+import threading
+from habittracker import metrics
+from habittracker.habit import Habit, habit_from_dict, name_key, unique_name
+from habittracker.storage import StorageBackend, JsonBackend, file_stamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    name_key    TEXT NOT NULL UNIQUE,   -- normalized name for lookups (habit.name_key)
+    periodicity TEXT NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completions (
+    habit_id INTEGER NOT NULL REFERENCES habits(id),
+    date     TEXT NOT NULL              -- 'YYYY-MM-DD'
+);
+CREATE INDEX IF NOT EXISTS idx_completions_habit_date ON completions (habit_id, date);
+"""
+KEY_VERSION = 2   # PRAGMA user_version: 0 = name_key was name.lower(), 1 = habit.name_key,
+                  # 2 = habits whose names collided under name_key are renamed (habit.unique_name)
+
+def db_path_for(json_path):
+    """Return the database file that replaces a profile's JSON file."""
+    base, _ = os.path.splitext(json_path)
+    return base + ".db"
+
+def upgrade_name_keys(conn):
+    """
+    Recompute the name_key column of databases created before KEY_VERSION (once).
+    A habit whose name now normalizes to the key of an older habit is renamed
+    ('Drink Water (2)'), so every habit stays reachable by name.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= KEY_VERSION:
+        return
+    with conn:
+        rows = conn.execute("SELECT id, name FROM habits ORDER BY id").fetchall()
+        conn.execute("UPDATE habits SET name_key = ' ' || id")   # temporary keys; real ones never start with a space
+        taken = set()
+        for habit_id, name in rows:
+            name = unique_name(name, taken)
+            taken.add(name_key(name))
+            conn.execute("UPDATE habits SET name = ?, name_key = ? WHERE id = ?", (name, name_key(name), habit_id))
+        conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+
+class SqliteBackend(StorageBackend):
+    """Stores the habits of a profile in one SQLite database."""
+
+    indexed = True   # get_habit and per-habit completions are index queries
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    @property
+    def conn(self):
+        """Open the database on first use."""
+        with self._conn_lock:
+            if self._conn is None:
+                # the repository serializes access, so threads may share the connection
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.executescript(SCHEMA)
+                upgrade_name_keys(conn)
+                self._conn = conn
+            return self._conn
+
+    def close(self):
+        """Close the database connection (it is reopened on next use)."""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def init(self):
+        self.conn  # opening the database creates the file and tables
+
+    def _habit_id(self, name):
+        """Return the row id of a habit (case-insensitive), or None."""
+        row = self.conn.execute(
+            "SELECT id FROM habits WHERE name_key = ?", (name_key(name),)
+        ).fetchone()
+        return row[0] if row else None
+
+    @metrics.timed("storage.load_habits")
+    def load_habits(self):
+        habits = {}
+        for habit_id, name, periodicity, created_at in self.conn.execute(
+                "SELECT id, name, periodicity, created_at FROM habits ORDER BY id"):
+            habits[habit_id] = Habit(name, periodicity, created_at, [])
+        for habit_id, day in self.conn.execute(
+                "SELECT habit_id, date FROM completions ORDER BY habit_id, date"):
+            habits[habit_id].add_completion(day)
+        return list(habits.values())
+
+    def iter_habits(self):
+        """Yield the habits one at a time from a single ordered query."""
+        habit, habit_id = None, None
+        for row_id, name, periodicity, created_at, day in self.conn.execute(
+                "SELECT h.id, h.name, h.periodicity, h.created_at, c.date FROM habits h "
+                "LEFT JOIN completions c ON c.habit_id = h.id ORDER BY h.id, c.date"):
+            if row_id != habit_id:
+                if habit is not None:
+                    yield habit
+                habit, habit_id = Habit(name, periodicity, created_at, []), row_id
+            if day is not None:
+                habit.add_completion(day)
+        if habit is not None:
+            yield habit
+
+    @metrics.timed("storage.save_habits")
+    def save_habits(self, habits):
+        with self.conn:
+            self.conn.execute("DELETE FROM completions")
+            self.conn.execute("DELETE FROM habits")
+            for h in habits:
+                self._insert(h)
+
+    def _insert(self, habit):
+        """Insert one habit and its completions (inside a transaction)."""
+        cursor = self.conn.execute(
+            "INSERT INTO habits (name, name_key, periodicity, created_at) VALUES (?, ?, ?, ?)",
+            (habit.name, name_key(habit.name), habit.periodicity, habit.created_at),
+        )
+        self.conn.executemany(
+            "INSERT INTO completions (habit_id, date) VALUES (?, ?)",
+            [(cursor.lastrowid, day) for day in habit.completions],
+        )
+
+    def get_habit(self, name):
+        row = self.conn.execute(
+            "SELECT id, name, periodicity, created_at FROM habits WHERE name_key = ?",
+            (name_key(name),),
+        ).fetchone()
+        if row is None:
+            return None
+        habit_id, name, periodicity, created_at = row
+        days = [day for (day,) in self.conn.execute(
+            "SELECT date FROM completions WHERE habit_id = ? ORDER BY date", (habit_id,))]
+        return Habit(name, periodicity, created_at, days)
+
+    def add_habit(self, habit):
+        with self.conn:
+            self._insert(habit)
+
+    def delete_habit(self, name):
+        habit_id = self._habit_id(name)
+        if habit_id is None:
+            return False
+        row = (habit_id,)
+        with self.conn:
+            self.conn.execute("DELETE FROM completions WHERE habit_id = ?", row)
+            self.conn.execute("DELETE FROM habits WHERE id = ?", row)
+        return True
+
+    def add_completion(self, name, completion):
+        habit_id = self._habit_id(name)
+        if habit_id is None:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO completions (habit_id, date) VALUES (?, ?)", (habit_id, completion)
+            )
+
+    def stamp(self):
+        return file_stamp(self.path)
+
+    @metrics.timed("storage.save_changes")
+    def save_changes(self, habits, events):
+        """Persist several changes in one transaction."""
+        with self.conn:
+            for event in events:
+                op = event.get("op")
+                if op == "complete":
+                    habit_id = self._habit_id(event["name"])
+                    if habit_id is not None:
+                        self.conn.execute(
+                            "INSERT INTO completions (habit_id, date) VALUES (?, ?)",
+                            (habit_id, event["date"]),
+                        )
+                elif op == "add":
+                    self._insert(habit_from_dict(event["habit"]))
+                elif op == "delete":
+                    self.conn.execute(
+                        "DELETE FROM completions WHERE habit_id IN (SELECT id FROM habits WHERE name = ?)",
+                        (event["name"],),
+                    )
+                    self.conn.execute("DELETE FROM habits WHERE name = ?", (event["name"],))
+
+    def import_json(self, json_path):
+        """
+        Import the habits of a JSON profile file.
+        Habits that already exist (same name, any case) are skipped.
+        Returns the number of imported habits.
+        """
+        with open(json_path, "r") as file:
+            habits = [habit_from_dict(item) for item in json.load(file)]
+        JsonBackend(json_path).replay_journal(habits)  # include changes still in the journal
+        imported = 0
+        with self.conn:
+            for habit in habits:
+                if self._habit_id(habit.name) is None:
+                    self._insert(habit)
+                    imported += 1
+        return imported
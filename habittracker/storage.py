@@ -1,10 +1,30 @@
 """"
-Handles saving and loading habits in JSON format.
+Handles saving and loading habits.
 Each profile (real or demo) uses its own file.
+
+Storage goes through a backend object (see StorageBackend):
+- JsonBackend:   one JSON file per profile (the default)
+- SqliteBackend: one SQLite database per profile (see sqlite_storage.py)
+- BinaryBackend: one binary snapshot file per profile (see binary_storage.py)
+The backend is chosen with set_backend() or the HABITTRACKER_BACKEND
+environment variable ("json", "sqlite" or "binary").
+
+Optional journal mode for the JSON backend: instead of rewriting the whole
+file on every change, single changes (add, delete, check-off) are appended
+to a small JSON Lines journal next to the JSON file. Loading replays the
+journal on top of the JSON snapshot, and the journal is folded back into the
+snapshot (compaction) every COMPACT_EVERY entries.
 """
 import json
 import os
-from habittracker.habit import habit_from_dict
+from contextlib import contextmanager
+from habittracker import metrics
+from habittracker.habit import habit_from_dict, name_key
+
+try:
+    import fcntl   # advisory file locks (not available on Windows)
+except ImportError:
+    fcntl = None
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 REAL_FILE = os.path.join(PROJECT_ROOT, "habits.json")
@@ -12,6 +32,13 @@ DEMO_FILE = os.path.join(PROJECT_ROOT, "demo_user_habits.json")
 TEST_FILE = os.path.join(PROJECT_ROOT, "test_habits.json")
 FILE_PATH = REAL_FILE
 
+BACKEND = os.environ.get("HABITTRACKER_BACKEND", "json")   # "json", "sqlite" or "binary"
+JOURNAL_ENABLED = False   # False = rewrite the whole file on every change
+CHUNK_SIZE = 1 << 16      # characters read at a time when streaming a JSON file
+COMPACT_EVERY = 1000      # journal entries before they are folded into the snapshot
+FSYNC_POLICY = "always"   # "always", "snapshot" (only full-file writes) or "never"
+_backends = {}            # (backend kind, file, journal) -> backend instance
+
 def use_test_file():
     """Switch to a separate JSON file used only for testing."""
     global FILE_PATH
@@ -22,31 +49,519 @@ def set_profile(profile):
     global FILE_PATH
     FILE_PATH = DEMO_FILE if profile == "demo" else REAL_FILE
 
+def set_backend(kind):
+    """Switch between the 'json', 'sqlite' and 'binary' storage backends."""
+    global BACKEND
+    if kind not in ("json", "sqlite", "binary"):
+        raise ValueError(f"Unknown storage backend: {kind}")
+    BACKEND = kind
+
+def use_journal(enabled=True):
+    """Turn the append-only journal mode on or off (JSON backend only)."""
+    global JOURNAL_ENABLED
+    JOURNAL_ENABLED = enabled
+
+def get_backend():
+    """
+    Return the backend for the current profile.
+    Backends are created once per file and then reused.
+    """
+    key = (BACKEND, FILE_PATH, JOURNAL_ENABLED)
+    backend = _backends.get(key)
+    if backend is None:
+        if BACKEND == "sqlite":
+            from habittracker.sqlite_storage import SqliteBackend, db_path_for
+            backend = SqliteBackend(db_path_for(FILE_PATH))
+        elif BACKEND == "binary":
+            from habittracker.binary_storage import BinaryBackend, snapshot_path_for
+            backend = BinaryBackend(snapshot_path_for(FILE_PATH))
+        else:
+            backend = JsonBackend(FILE_PATH, journal=JOURNAL_ENABLED)
+        _backends[key] = backend
+    return backend
+
+
+class StorageBackend:
+    """
+    The operations the rest of the app needs from a storage engine.
+    Names are matched like the domain rules (see habit.name_key);
+    journal events always carry the exact stored name.
+    """
+    indexed = False   # True if get_habit is an index query (no full load), see repository.py
+
+    def init(self):
+        """Create the underlying file/database if it does not exist."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release open files or connections (the backend may be used again later)."""
+
+    def load_habits(self):
+        """Return all habits as a list of Habit objects."""
+        raise NotImplementedError
+
+    def iter_habits(self):
+        """Yield the habits one at a time (backends can stream them)."""
+        return iter(self.load_habits())
+
+    def save_habits(self, habits):
+        """Replace everything in storage with the given habits."""
+        raise NotImplementedError
+
+    def get_habit(self, name):
+        """Return the habit with this name, or None."""
+        raise NotImplementedError
+
+    def add_habit(self, habit):
+        """Store a new habit."""
+        raise NotImplementedError
+
+    def delete_habit(self, name):
+        """Remove a habit by its exact name. Returns True if deleted."""
+        raise NotImplementedError
+
+    def add_completion(self, name, completion):
+        """Record a completion date ('YYYY-MM-DD') for a habit."""
+        raise NotImplementedError
+
+    def stamp(self):
+        """
+        Return a value that changes whenever the stored data changes
+        (used by the in-memory repository to know when to reload).
+        """
+        raise NotImplementedError
+
+    def lock_path(self):
+        """Return the lock file of this profile (e.g. habits.json -> habits.lock)."""
+        base, _ = os.path.splitext(self.path)
+        return base + ".lock"
+
+    @contextmanager
+    def lock(self):
+        """
+        Hold an exclusive advisory lock on the profile while the block runs,
+        so read-modify-write sequences of several processes do not interleave.
+        Not re-entrant: do not nest lock() blocks for the same profile.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path(), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def save_change(self, habits, event):
+        """
+        Persist one change, e.g. {"op": "complete", "name": ..., "date": ...}.
+        habits is the full, already changed list; backends that store
+        single changes can ignore it.
+        """
+        op = event.get("op")
+        if op == "add":
+            self.add_habit(habit_from_dict(event["habit"]))
+        elif op == "delete":
+            self.delete_habit(event["name"])
+        elif op == "complete":
+            self.add_completion(event["name"], event["date"])
+
+    def save_changes(self, habits, events):
+        """Persist several changes; backends can do this in one write."""
+        for event in events:
+            self.save_change(habits, event)
+
+
+class JsonBackend(StorageBackend):
+    """Stores all habits of a profile in one JSON file (plus optional journal)."""
+
+    def __init__(self, path, journal=False):
+        self.path = path
+        self.journal = journal
+        self.journal_size = 0    # number of entries in the journal
+
+    def journal_path(self):
+        """Return the journal file that belongs to the JSON file."""
+        base, _ = os.path.splitext(self.path)
+        return base + ".journal.jsonl"    # e.g. habits.json -> habits.journal.jsonl
+
+    def init(self):
+        if not os.path.exists(self.path):
+            atomic_write(self.path, "[]")  # start with an empty list
+
+    @metrics.timed("storage.load_habits")
+    def load_habits(self):
+        """
+        Load all habits from the JSON file.
+        Any journal entries are replayed on top of the file.
+        A missing file counts as empty; a broken file raises HabitFileError.
+        """
+        return list(self.iter_habits())
+
+    def iter_habits(self):
+        """
+        Yield the habits one at a time, reading the JSON file in chunks,
+        so memory stays bounded by one habit (plus the journal).
+        Journal entries are applied to the habits they belong to on the way;
+        habits added by the journal come last, as with load_habits.
+        """
+        events, snapshot = self.open_consistent()
+        groups = {}    # habit name -> [(position in journal, event), ...]
+        for seq, event in enumerate(events):
+            name = event["habit"]["name"] if event.get("op") == "add" else event.get("name")
+            groups.setdefault(name, []).append((seq, event))
+        added = []     # (position in journal, habit) for habits added by the journal
+        if snapshot is not None:
+            with snapshot:
+                for item in iter_json_array(self.path, file=snapshot):
+                    habit = habit_from_dict(item)
+                    ops = groups.pop(habit.name, None)
+                    if ops is None:
+                        yield habit
+                        continue
+                    habit, new_habits = replay_for_name(ops, habit)
+                    if habit is not None:
+                        yield habit
+                    added.extend(new_habits)
+        for ops in groups.values():
+            added.extend(replay_for_name(ops, None)[1])
+        for _, habit in sorted(added, key=lambda pair: pair[0]):
+            yield habit
+
+    def open_consistent(self):
+        """
+        Read the journal and open the JSON file that it belongs to.
+        Works without the profile lock: if another process writes or compacts
+        (new file, journal removed) in between, both are read again.
+        Returns (journal events, open JSON file or None if there is none).
+        """
+        while True:
+            before = self.stamp()
+            events = self.read_journal()
+            try:
+                snapshot = open(self.path, "r")
+            except FileNotFoundError:
+                snapshot = None
+            if snapshot is None:
+                opened = None
+            else:
+                info = os.fstat(snapshot.fileno())
+                opened = info.st_ino, info.st_mtime_ns, info.st_size
+            if (opened, file_stamp(self.journal_path())) == before:
+                return events, snapshot
+            if snapshot is not None:
+                snapshot.close()
+
+    @metrics.timed("storage.save_habits")
+    def save_habits(self, habits):
+        """
+        Save all habits to the JSON file.
+        This is a full snapshot, so any journal is no longer needed afterwards.
+        """
+        text = json.dumps([h.to_dict() for h in habits], indent=2)  # indent=2 makes it easier to read
+        atomic_write(self.path, text)
+        if os.path.exists(self.journal_path()):
+            os.remove(self.journal_path())
+        self.journal_size = 0
+
+    def replay_journal(self, habits):
+        """
+        Apply the journal entries to a list of habits loaded from the snapshot.
+        A half-written last line (e.g. after a crash) is ignored.
+        """
+        for event in self.read_journal():
+            apply_event(habits, event)
+
+    def read_journal(self):
+        """
+        Return the journal entries as a list of events (and remember how many).
+        A half-written line (e.g. after a crash) is skipped.
+        """
+        events = []
+        if os.path.exists(self.journal_path()):
+            with open(self.journal_path(), "r") as file:
+                for line in file:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn write from a crash, see append_event
+            if metrics.ENABLED:
+                metrics.add_bytes(read=os.path.getsize(self.journal_path()))
+        self.journal_size = len(events)
+        return events
+
+    def append_event(self, event):
+        """Append one entry to the journal. Costs O(1) I/O."""
+        self.append_events([event])
+
+    def append_events(self, events):
+        """Append several entries to the journal with one write."""
+        line = "".join(json.dumps(event) + "\n" for event in events)
+        with open(self.journal_path(), "a+") as file:
+            if file.tell() > 0:
+                file.seek(file.tell() - 1)
+                if file.read(1) != "\n":
+                    line = "\n" + line   # a crash left a torn line: start a fresh one
+            file.write(line)
+            file.flush()
+            if metrics.ENABLED:
+                metrics.add_bytes(written=len(line.encode("utf-8")))
+            if FSYNC_POLICY == "always":
+                os.fsync(file.fileno())
+        self.journal_size += len(events)
+
+    def save_change(self, habits, event):
+        """
+        Persist one change to the habits.
+        - Journal mode: append the event, compact once the journal is long enough
+        - Otherwise: rewrite the whole JSON file
+        Args:
+            habits (list[Habit] | None): The full list of habits, already changed.
+                                         Only needed when the journal is off.
+            event (dict): The change, e.g. {"op": "complete", "name": ..., "date": ...}.
+        """
+        self.save_changes(habits, [event])
+
+    @metrics.timed("storage.save_changes")
+    def save_changes(self, habits, events):
+        """
+        Persist several changes with one journal append or one full write.
+        Args: see save_change.
+        """
+        if self.journal:
+            self.append_events(events)
+            if self.journal_size >= COMPACT_EVERY and habits is not None:
+                self.save_habits(habits)   # compaction: fold the journal into the snapshot
+            elif self.journal_size >= COMPACT_EVERY:
+                self.compact()
+        else:
+            self.save_habits(habits if habits is not None else self._apply_to_loaded(events))
+
+    def _apply_to_loaded(self, events):
+        """Load the habits, apply the events and return the result."""
+        habits = self.load_habits()
+        for event in events:
+            apply_event(habits, event)
+        return habits
+
+    def compact(self):
+        """Fold the journal into the JSON snapshot and remove it."""
+        self.save_habits(self.load_habits())
+
+    def get_habit(self, name):
+        key = name_key(name)
+        for h in self.iter_habits():
+            if name_key(h.name) == key:
+                return h
+        return None
+
+    def add_habit(self, habit):
+        self.save_change(None, {"op": "add", "habit": habit.to_dict()})
+
+    def delete_habit(self, name):
+        habits = self.load_habits()
+        key = name_key(name)
+        deleted = next((h for h in habits if name_key(h.name) == key), None)
+        if deleted is None:  # nothing to remove
+            return False
+        new_list = [h for h in habits if h is not deleted]  # only the first match, even if old names collide
+        self.save_change(new_list, {"op": "delete", "name": deleted.name})
+        return True
+
+    def add_completion(self, name, completion):
+        self.save_change(None, {"op": "complete", "name": name, "date": completion})
+
+    def stamp(self):
+        return file_stamp(self.path), file_stamp(self.journal_path())
+
+
+class HabitFileError(ValueError):
+    """Raised when a habits file cannot be read. The file is left unchanged."""
+
+
+def iter_json_array(path, chunk_size=None, file=None):
+    """
+    Yield the objects of a top-level JSON array one at a time.
+    The file is read in chunks, so only the current object is held in memory.
+    Reads from `file` if given (an open text file of path), else opens path.
+    Raises HabitFileError if the file is not a valid array of objects.
+    """
+    if file is None:
+        with open(path, "r") as file:
+            yield from iter_json_array(path, chunk_size, file)
+        return
+    chunk_size = chunk_size or CHUNK_SIZE
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0          # current position in buffer
+    dropped = 0      # characters already removed from the front of buffer
+    eof = False
+    expect = "["     # what must come next: "[", "value", "," (or "]"), "end"
+
+    while True:
+        # skip whitespace, reading more of the file when the buffer runs out
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        if pos == len(buffer) and not eof:
+            dropped += pos
+            buffer, pos = file.read(chunk_size), 0
+            eof = buffer == ""
+            if metrics.ENABLED:
+                metrics.add_bytes(read=len(buffer))   # characters; bytes for ASCII files
+            continue
+        if pos == len(buffer):
+            if expect != "end":
+                raise HabitFileError(f"{path}: unexpected end of file (file left unchanged).")
+            return
+
+        char = buffer[pos]
+        if expect == "[" and char == "[":
+            pos, expect = pos + 1, "value"
+        elif expect in ("value", ",") and char == "]":
+            pos, expect = pos + 1, "end"
+        elif expect == "," and char == ",":
+            pos, expect = pos + 1, "next"
+        elif expect in ("value", "next"):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise HabitFileError(
+                        f"{path}: malformed habit at character {dropped + pos} (file left unchanged)."
+                    )
+                more = file.read(max(chunk_size, len(buffer)))  # object spans chunks: read more
+                eof = more == ""
+                buffer += more
+                if metrics.ENABLED:
+                    metrics.add_bytes(read=len(more))
+                continue
+            if not isinstance(item, dict):
+                raise HabitFileError(f"{path}: expected a habit object at character {dropped + pos}.")
+            yield item
+            pos, expect = end, ","
+            if pos > chunk_size:  # forget what was already parsed
+                dropped += pos
+                buffer, pos = buffer[pos:], 0
+        else:
+            raise HabitFileError(
+                f"{path}: unexpected {char!r} at character {dropped + pos} (file left unchanged)."
+            )
+
+
+def replay_for_name(ops, habit):
+    """
+    Replay the journal entries of one habit name.
+    Args:
+        ops (list): (position in journal, event) pairs for this name, in order.
+        habit (Habit | None): The habit with this name from the JSON file, if any.
+    Returns:
+        tuple: (the file's habit or None if deleted, [(position, habit)] added by the journal).
+    """
+    items = [(-1, habit)] if habit is not None else []   # same order as in the full list
+    for seq, event in ops:
+        op = event.get("op")
+        if op == "add":
+            items.append((seq, habit_from_dict(event["habit"])))
+        elif op == "delete":
+            items = []
+        elif op == "complete" and items:
+            items[0][1].add_completion(event["date"])
+    if items and items[0][0] == -1:
+        return items[0][1], items[1:]
+    return None, items
+
+
+def atomic_write(path, text):
+    """
+    Replace a file's content in one step: write a temporary file next to it,
+    then os.replace() it over the old one. A crash leaves either the old
+    or the new file, never a truncated one. Flushed to disk per FSYNC_POLICY.
+    text can also be bytes (for binary files).
+    """
+    import shutil      # imported here: only needed when writing,
+    import tempfile    # which keeps read-only commands fast to start
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(text, bytes) else "w") as file:
+            file.write(text)
+            file.flush()
+            if metrics.ENABLED:
+                metrics.add_bytes(written=file.tell())
+            if FSYNC_POLICY != "never":
+                os.fsync(file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)   # keep the file permissions
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if FSYNC_POLICY != "never":
+        fsync_directory(directory)
+
+def fsync_directory(directory):
+    """Flush a directory entry (the rename) to disk, where the OS supports it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows cannot open directories
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def file_stamp(path):
+    """
+    Return (inode, modification time, size) of a file, or None if it is missing.
+    atomic_write gives every new version a new inode, so rewrites are always noticed.
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_ino, info.st_mtime_ns, info.st_size
+
+def apply_event(habits, event):
+    """Apply one journal entry to the list of habits (in place)."""
+    op = event.get("op")
+    if op == "add":
+        habits.append(habit_from_dict(event["habit"]))
+    elif op == "delete":
+        habits[:] = [h for h in habits if h.name != event["name"]]
+    elif op == "complete":
+        for h in habits:
+            if h.name == event["name"]:
+                h.add_completion(event["date"])
+                break
+
+
+# Module-level helpers for the current profile (kept for existing callers)
+
 def init_storage():
     """
-    Create the JSON file if it does not exist.
+    Create the storage file if it does not exist.
     """
-    if not os.path.exists(FILE_PATH):
-        with open(FILE_PATH, "w") as file:
-            json.dump([], file)  # start with an empty list
+    get_backend().init()
 
 def load_habits():
     """
-    Load all habits from the JSON file.
+    Load all habits of the current profile.
     Returns a list of Habit objects.
     """
-    try:
-        with open(FILE_PATH, "r") as file:
-            data = json.load(file)  # read JSON data
-            return [habit_from_dict(item) for item in data]  # convert dicts to Habit objects
-    except:
-        # If the file is missing or broken, create a new empty file
-        save_habits([])
-        return []
+    return get_backend().load_habits()
+
+def iter_habits():
+    """
+    Yield the habits of the current profile one at a time.
+    """
+    return get_backend().iter_habits()
 
 def save_habits(habits):
     """
-    Save all habits to the JSON file.
+    Save all habits of the current profile.
     """
-    with open(FILE_PATH, "w") as file:
-        json.dump([h.to_dict() for h in habits], file, indent=2)  # indent=2 makes it easier to read"
\ No newline at end of file
+    get_backend().save_habits(habits)
@@ -2,8 +2,10 @@
 Helper functions for working with dates in ISO format.
 All dates are represented as 'YYYY-MM-DD' strings.
 """
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
 ISO_FORMAT = "%Y-%m-%d"
+KEY_CACHE_SIZE = 1 << 16  # distinct dates remembered by daily_key / weekly_key
 
 def parse_iso(iso_timestamp: str) -> datetime:
     """
@@ -12,7 +14,16 @@ def parse_iso(iso_timestamp: str) -> datetime:
         iso_timestamp (str): A date string in ISO format.
     Returns:
         datetime: A datetime object representing the given date.
+    Raises:
+        ValueError: If the string is not a valid date (same as strptime).
     """
+    # Fast path for the exact 'YYYY-MM-DD' layout: fromisoformat is ~10x cheaper than strptime
+    if len(iso_timestamp) == 10 and iso_timestamp[4] == "-" and iso_timestamp[7] == "-":
+        try:
+            return datetime.fromisoformat(iso_timestamp)
+        except ValueError:
+            pass  # e.g. 2025-02-30: let strptime raise its usual error
+    # Anything else (e.g. '2025-9-3' or bad input) goes through strptime as before
     return datetime.strptime(iso_timestamp, ISO_FORMAT)
 
 def to_iso(date_time: datetime) -> str:
@@ -25,6 +36,7 @@ def to_iso(date_time: datetime) -> str:
     """
     return date_time.strftime(ISO_FORMAT)
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def daily_key(iso_timestamp: str) -> tuple[int, int, int]:
     """
     Extract (year, month, day) as a tuple from an ISO date string.
@@ -37,6 +49,7 @@ def daily_key(iso_timestamp: str) -> tuple[int, int, int]:
     date_obj = parse_iso(iso_timestamp)
     return (date_obj.year, date_obj.month, date_obj.day)
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def weekly_key(iso_timestamp: str) -> tuple[int, int]:
     """
     Extract (iso_year, iso_week) as a tuple from an ISO date string.
@@ -48,4 +61,46 @@ def weekly_key(iso_timestamp: str) -> tuple[int, int]:
     """
     date_obj = parse_iso(iso_timestamp)
     iso_year, iso_week, _ = date_obj.isocalendar()
-    return (iso_year, iso_week)
\ No newline at end of file
+    return (iso_year, iso_week)
+
+def to_ordinal(iso_timestamp: str) -> int:
+    """
+    Convert an ISO date string into its proleptic Gregorian day number.
+    Args:
+        iso_timestamp (str): A date string in ISO format.
+    Returns:
+        int: The day number (0001-01-01 is day 1), see date.toordinal().
+    """
+    return parse_iso(iso_timestamp).toordinal()
+
+def from_ordinal(day_number: int) -> str:
+    """
+    Convert a proleptic Gregorian day number back into an ISO date string.
+    Args:
+        day_number (int): The day number, see date.toordinal().
+    Returns:
+        str: The date as an ISO string.
+    """
+    return date.fromordinal(day_number).isoformat()
+
+def week_index(day_number: int) -> int:
+    """
+    Return a running week number for a day number (see date.toordinal).
+    Weeks start on Monday like ISO weeks, and consecutive weeks always
+    differ by exactly 1, also across year boundaries.
+    Args:
+        day_number (int): The day number of any day in the week.
+    Returns:
+        int: The week number (0 for the week of 0001-01-01).
+    """
+    return (day_number - 1) // 7  # day 1 (0001-01-01) is a Monday
+
+def week_start(day_number: int) -> int:
+    """
+    Return the day number of the Monday that starts the week of a day (see week_index).
+    Args:
+        day_number (int): The day number of any day in the week.
+    Returns:
+        int: The day number of that week's Monday.
+    """
+    return 7 * week_index(day_number) + 1
@@ -0,0 +1,138 @@
+"""
+Time-series analytics over date ranges: completion rates for any window,
+rolling rates, weekday and ISO-week heatmaps, and the streak as of a day.
+
+Build a Timeline once per habit (O(n) for n completions); after that every
+window query is a few binary searches over the sorted day numbers
+(O(log n)), so a dashboard can ask for many windows cheaply.
+Build a new Timeline after the habit changes.
+
+Dates are `date` objects (or datetimes); windows include both ends.
+A window only counts periods from the habit's creation onwards.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from habittracker.time_utils import to_ordinal, week_index, week_start
+
+ROLLING_WINDOWS = (7, 30)   # window sizes in days used by rolling_summary
+
+
+class Timeline:
+    """Precomputed, read-only view of one habit's completions for range queries."""
+
+    def __init__(self, habit):
+        self.name = habit.name
+        self.periodicity = habit.periodicity
+        self.days = array("i", habit.ordinals)          # sorted day numbers (a snapshot)
+        if habit.periodicity == "daily":
+            self.periods = self.days
+        else:
+            self.periods = array("i", (week_index(day) for day in self.days))
+        self.created = habit.period_of(to_ordinal(habit.created_at))
+        # run_start[i] = index of the first completion of the run that contains completion i
+        self.run_start = array("i", bytes(4 * len(self.periods)))
+        for i in range(1, len(self.periods)):
+            if self.periods[i] - self.periods[i - 1] == 1:
+                self.run_start[i] = self.run_start[i - 1]
+            else:
+                self.run_start[i] = i
+        self._weekday_prefix = None   # built on the first weekday_heatmap call
+
+    def period_of(self, day):
+        """Return the period (day number or running week number) of a date."""
+        ordinal = day.toordinal()
+        return ordinal if self.periodicity == "daily" else week_index(ordinal)
+
+    def count_between(self, start, end):
+        """Return how many completions fall between start and end (inclusive)."""
+        return bisect_right(self.days, end.toordinal()) - bisect_left(self.days, start.toordinal())
+
+    def rate_between(self, start, end):
+        """
+        Share of the periods (days or ISO weeks) touched by the window that
+        have a completion, between 0.0 and 1.0. Periods before the habit was
+        created are not counted; returns 0.0 if no period is left.
+        """
+        first = max(self.period_of(start), self.created)
+        last = self.period_of(end)
+        if last < first:
+            return 0.0
+        done = bisect_right(self.periods, last) - bisect_left(self.periods, first)
+        return min(1.0, done / (last - first + 1))
+
+    def rolling_rates(self, start, end, days=7):
+        """
+        Return (date, rate) for every day from start to end, where rate is
+        rate_between over the `days` days ending on that date.
+        """
+        window = timedelta(days=days - 1)
+        result = []
+        day = start
+        while day <= end:
+            result.append((day, self.rate_between(day - window, day)))
+            day += timedelta(days=1)
+        return result
+
+    def streak_as_of(self, day):
+        """
+        Return the current streak (in days or weeks) as it stood on a date.
+        The streak is still alive if the habit was done in that period or the
+        one before it (today's check-off may still come), otherwise it is 0.
+        Completions after the date are ignored.
+        """
+        period = self.period_of(day)
+        i = bisect_right(self.periods, period) - 1   # last completion up to that period
+        if i < 0 or self.periods[i] < period - 1:
+            return 0
+        return i - self.run_start[i] + 1
+
+    def weekday_heatmap(self, start=None, end=None):
+        """
+        Return completions per weekday [Monday, ..., Sunday] between start
+        and end (default: the whole history).
+        """
+        if self._weekday_prefix is None:
+            # prefix[w][i] = completions among the first i that fall on weekday w
+            prefix = [array("i", [0]) for _ in range(7)]
+            for day in self.days:
+                weekday = day - week_start(day)        # 0 = Monday
+                for w in range(7):
+                    prefix[w].append(prefix[w][-1] + (w == weekday))
+            self._weekday_prefix = prefix
+        lo = bisect_left(self.days, start.toordinal()) if start else 0
+        hi = bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        return [counts[hi] - counts[lo] for counts in self._weekday_prefix]
+
+    def iso_week_heatmap(self, start, end):
+        """
+        Return ((iso_year, iso_week), completions) for every ISO week that
+        overlaps the window, oldest first.
+        """
+        result = []
+        lo = start.toordinal()
+        monday = week_start(lo)
+        while monday <= end.toordinal():
+            first = max(monday, lo)
+            last = min(monday + 6, end.toordinal())
+            count = bisect_right(self.days, last) - bisect_left(self.days, first)
+            iso_year, iso_week, _ = date.fromordinal(monday).isocalendar()
+            result.append(((iso_year, iso_week), count))
+            monday += 7
+        return result
+
+
+def rolling_summary(habits, today=None):
+    """
+    Return one dict per habit with the current streak relative to today and
+    the completion rates over the last 7 and 30 days.
+    """
+    today = today or date.today()
+    rows = []
+    for habit in habits:
+        timeline = Timeline(habit)
+        row = {"name": habit.name, "streak_today": timeline.streak_as_of(today)}
+        for days in ROLLING_WINDOWS:
+            row[f"rate_{days}d"] = timeline.rate_between(today - timedelta(days=days - 1), today)
+        rows.append(row)
+    return rows